@@ -0,0 +1,24 @@
+import multiprocessing as mp
+import sys
+import warnings
+
+from src.backtester import WorkQueue
+
+warnings.filterwarnings('ignore')
+
+
+def work(root: str) -> None:
+    WorkQueue(root).work()
+
+
+if __name__ == "__main__":
+    # runs units of a sweep submitted with `WorkQueue(root).submit(runner)`, start on
+    # every node sharing `root`. usage: python -m scripts.queue_worker <root> [processes]
+    root = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else mp.cpu_count()
+
+    workers = [mp.Process(target=work, args=(root,)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
@@ -1 +1,3 @@
 from . hedging_agent import HedgingAgent
+from . vector_hedging_agent import VectorHedgingAgent
+from . ladder_hedging_agent import LadderHedgingAgent
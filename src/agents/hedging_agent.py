@@ -1,17 +1,18 @@
+from typing import Optional
+
+import numpy as np
 from numpy import isnan
 from numpy import round as np_round
 
-from src.base import BaseDataFeeder, BaseAgent, BaseModel, BaseTimer
+from src.base import BaseDataFeeder, BaseAgent, BaseModel, BaseTimer, BaseEstimator
+from src.journal import ColumnBuffer
+from src.models import ExposureTrack
 from src.models.geom_bm import GBMStepModel
 
 
-class UnderlyingOrder:
-    def __init__(self, exec_price: float, quantity: float):
-        self.exec_price = exec_price
-        self.quantity = quantity
-
-    def accum(self, curr_price) -> float:
-        return self.quantity * (curr_price - self.exec_price)
+EXPOSURE_COLUMNS = ("value", "iv", "delta", "vega", "theta", "gamma")
+CURVE_COLUMNS = ("time", "d_price", "u_price", "equity", "hedge_pnl", "realized_pnl",
+                 "under_position", "deriv_position", "portfolio_delta") + EXPOSURE_COLUMNS
 
 
 class HedgingAgent(BaseAgent):
@@ -22,19 +23,66 @@ class HedgingAgent(BaseAgent):
                  strike: float,
                  max_under_pos: float = .0005,
                  min_tte_hedge: float = .15,
-                 model: BaseModel = GBMStepModel
+                 model: BaseModel = GBMStepModel,
+                 estimator: Optional[BaseEstimator] = None,
+                 sigma_col: str = "4_hour_sigma_log",
+                 exposure_track: Optional[ExposureTrack] = None,
+                 curve_length: Optional[int] = None,
+                 memoize: bool = True,
+                 theta_update: bool = False
                  ):
+        """
+        Args:
+            estimator (Optional[BaseEstimator], optional): online volatility estimator fed
+                the underlying every cycle. If None, volatility is read from `sigma_col`
+            sigma_col (str, optional): precomputed volatility column of the underlying data
+            exposure_track (Optional[ExposureTrack], optional): precomputed exposures of this
+                contract on this timer's schedule, read instead of calling the model
+            curve_length (Optional[int], optional): if given, the last `curve_length` cycles
+                of equity & exposures are kept in `curve`
+            memoize (bool, optional): reuse the last exposures when the model inputs haven't
+                changed, as between ticks of forward filled feeders
+            theta_update (bool, optional): when only time to expiration changed, also reuse
+                them, moving value along theta at the estimated volatility instead of
+                calling the model. Delta and the other exposures, so the hedge, stay those
+                of the last model call
+        """
         self.timer = timer
         self.deriv_feeder = derivative_feeder
         self.under_feeder = underlying_feeder
         self.model = model
         self.strike = strike
 
+        # volatility source
+        self.estimator = estimator
+        self.sigma_col = sigma_col
+
+        # precomputed exposures, indexed by cycle
+        self.exposure_track = exposure_track
+        self._cycle = 0
+
+        # last model inputs & their exposures
+        self.memoize = memoize
+        self.theta_update = theta_update
+        self._last_inputs = None
+        self._last_exposures = None
+        self.model_calls_avoided = 0
+
         # tracking positions
-        self.under_orders = []
         self.under_position = 0  # in num shares
         self.deriv_position = 0  # in num contracts
-        self.cash = 0  # in dollars
+        self.cash = 0  # in cents
+
+        # running totals of underlying orders, instead of keeping every order
+        self.under_cost = 0  # sum of quantity * exec price
+        self.cost_basis = 0  # cost of the open position, at average price
+        self.realized_pnl = 0  # from reducing the position, against average price
+        self.under_turnover = 0  # sum of abs(quantity)
+
+        # per cycle equity & exposures
+        self.curve = None
+        if curve_length is not None:
+            self.curve = ColumnBuffer([(name, np.float64) for name in CURVE_COLUMNS], maxlen=curve_length)
 
         # hedging position restraints
         self.max_under_pos = max_under_pos
@@ -67,25 +115,47 @@ class HedgingAgent(BaseAgent):
 
     def purchase_deriv(self, data: dict) -> None:
         if self.deriv_position == 0:
-            # assume execution at mid-market price
-            execution_price = (data['ask'] - data['bid'])/200
+            # assume execution at mid-market price, in cents
+            execution_price = (data['ask'] + data['bid'])/2
 
             # updating portfolio
             self.deriv_position += 1
             self.cash -= execution_price
 
-    def purchase_underlying(self, data: dict, quantity: float) -> None:
+    def clip_quantity(self, quantity: float) -> float:
+        """limits an underlying trade so the position stays within +/- `max_under_pos`"""
         if quantity > 0:
-            quantity = max(
+            return max(
                 min(self.max_under_pos - self.under_position, quantity), 0)
-        else:
-            quantity = min(max(-self.max_under_pos -
-                           self.under_position, quantity), 0)
+        return min(max(-self.max_under_pos -
+                       self.under_position, quantity), 0)
+
+    def purchase_underlying(self, data: dict, quantity: float) -> None:
+        quantity = self.clip_quantity(quantity)
 
         if quantity != 0:
-            order = UnderlyingOrder(exec_price=data['open'], quantity=quantity)
-            self.under_orders.append(order)
-            self.under_position += quantity
+            self.book_underlying(data['open'], quantity)
+
+    def book_underlying(self, exec_price: float, quantity: float) -> None:
+        """updates position and running totals for an underlying order"""
+        position = self.under_position
+        if position == 0 or (position > 0) == (quantity > 0):
+            self.cost_basis += quantity * exec_price
+        else:
+            # the part closing the position realizes against its average price, any
+            # remainder opens a new position at the execution price
+            closed = quantity if abs(quantity) < abs(position) else -position
+            if closed == -position:
+                self.realized_pnl += position * exec_price - self.cost_basis
+                self.cost_basis = (quantity - closed) * exec_price
+            else:
+                average_price = self.cost_basis / position
+                self.realized_pnl += -closed * (exec_price - average_price)
+                self.cost_basis += closed * average_price
+
+        self.under_cost += quantity * exec_price
+        self.under_turnover += abs(quantity)
+        self.under_position += quantity
 
     def portfolio_delta(self, exposures: dict) -> float:
         deriv_delta_exposure = exposures['delta']
@@ -101,25 +171,95 @@ class HedgingAgent(BaseAgent):
         self.purchase_underlying(u_data, -self.under_position)
 
     def reconcile_hedge(self, u_price):
-        return sum(order.accum(u_price) for order in self.under_orders)
+        """P&L of every underlying order marked at `u_price`"""
+        return u_price * self.under_position - self.under_cost
+
+    def unrealized_pnl(self, u_price) -> float:
+        """P&L of the open underlying position marked at `u_price`"""
+        return u_price * self.under_position - self.cost_basis
+
+    def equity(self, d_price: float, u_price: float) -> float:
+        """cash, derivative position at `d_price` and hedge P&L at `u_price`, in dollars"""
+        return self.cash/100 + self.deriv_position * d_price + self.reconcile_hedge(u_price)
+
+    def record(self, d_data: dict, u_data: dict, exposures: dict) -> None:
+        d_price = (d_data["ask"] + d_data["bid"])/200
+        u_price = u_data["open"]
+        self.curve.append(self.timer.time(),
+                          d_price,
+                          u_price,
+                          self.equity(d_price, u_price),
+                          self.reconcile_hedge(u_price),
+                          self.realized_pnl,
+                          self.under_position,
+                          self.deriv_position,
+                          exposures['portfolio_delta'],
+                          *(exposures[name] for name in EXPOSURE_COLUMNS))
+
+    def estimate_sigma(self, u_data: dict) -> float:
+        if self.estimator is None:
+            return u_data[self.sigma_col]
+
+        # feeders forward fill, estimator ignores ticks it has already seen
+        u_time = u_data.get('ts')
+        if u_time is None:
+            u_time = self.under_feeder.time()
+        self.estimator.update(u_time, u_data['open'])
+
+        return self.estimator.value()
+
+    def model_inputs(self, d_data: dict, u_data: dict) -> tuple:
+        """positional model arguments for this cycle: price, underlying price, volatility,
+        drift, time to expiration & strike
+        """
+        d_price = (d_data["ask"] + d_data["bid"])/200
+        u_price = u_data["open"]
+        estimated_sigma = self.estimate_sigma(u_data)
+        tte = d_data['tte']
+
+        return d_price, u_price, estimated_sigma, 0, tte, self.strike
+
+    def model_exposures(self, d_data: dict, u_data: dict) -> dict:
+        if self.exposure_track is not None:
+            exposures = self.exposure_track.exposures(self._cycle, self.timer.time())
+            self._cycle += 1
+            return exposures
+
+        inputs = self.model_inputs(d_data, u_data)
+        last_inputs = self._last_inputs
+        if self.memoize and last_inputs is not None:
+            if inputs == last_inputs:
+                self.model_calls_avoided += 1
+                return dict(self._last_exposures)
+
+            # inputs are price, underlying price, volatility, drift, tte & strike
+            if (self.theta_update and inputs[4] > 0 and inputs[:4] == last_inputs[:4]
+                    and inputs[5:] == last_inputs[5:]):
+                # only tte moved, first order update of value. theta is the value's
+                # change per hour passing, that is per hour of tte lost. value is priced
+                # at the estimated volatility, the exposures' theta at iv
+                _, u_price, sigma, mu, last_tte, strike = last_inputs
+                theta = self.model._theta(u_price, strike, sigma, mu, last_tte)
+                exposures = dict(self._last_exposures)
+                exposures['value'] += theta * (last_tte - inputs[4])
+                self._last_inputs = inputs
+                self._last_exposures = exposures
+                self.model_calls_avoided += 1
+                return dict(exposures)
+
+        # exposures use iv for volatility estimate. passed positionally since
+        # models name the volatility argument differently (sigma vs scale)
+        exposures = self.model.__call__(*inputs)
+        if self.memoize:
+            self._last_inputs = inputs
+            self._last_exposures = dict(exposures)
+        return exposures
 
     def consume(self):
         new_deriv_data = self.deriv_feeder.get()
         new_under_data = self.under_feeder.get()
 
-        d_price = (new_deriv_data["ask"] + new_deriv_data["bid"])/200
-        u_price = new_under_data["open"]
-        estimated_sigma = new_under_data["4_hour_sigma_log"]
-        tte = new_deriv_data['tte']
-
-        # exposures use iv for volatility estimate
-        exposures = self.model.__call__(
-            price=d_price,
-            u_price=u_price,
-            estimated_sigma=estimated_sigma,
-            estimated_mu=0,
-            tte=tte,
-            strike=self.strike)
+        exposures = self.model_exposures(new_deriv_data, new_under_data)
         exposures['portfolio_delta'] = self.portfolio_delta(exposures)
 
         # if close to expiration, zero the hedge and carry the contract to expiration
@@ -134,4 +274,112 @@ class HedgingAgent(BaseAgent):
             # rebalancing elta hedge
             self.rebalance_hedge(new_under_data, exposures)
 
+        if self.curve is not None:
+            self.record(new_deriv_data, new_under_data, exposures)
+
+        return exposures
+
+    def block_sigma(self, block: dict) -> np.ndarray:
+        """volatility of every cycle of a block, as `estimate_sigma`"""
+        u_block = block["under"]
+        if self.estimator is None:
+            return np.asarray(u_block[self.sigma_col], dtype=float)
+
+        u_times = u_block["ts"] if "ts" in u_block else block["sim_time"]
+        sigma = np.empty(len(block["time"]))
+        for i, (u_time, u_price) in enumerate(zip(np.asarray(u_times).tolist(),
+                                                  np.asarray(u_block["open"]).tolist())):
+            self.estimator.update(u_time, u_price)
+            sigma[i] = self.estimator.value()
+        return sigma
+
+    def block_exposures(self, block: dict) -> dict:
+        """exposures of every cycle of a block, from one model evaluation or the exposure track
+
+        Raises:
+            ValueError: the exposure track was built on another schedule
+        """
+        times = np.asarray(block["time"], dtype=float)
+        if self.exposure_track is not None:
+            track = self.exposure_track
+            start, end = self._cycle, self._cycle + len(times)
+            if end > len(track) or np.any(track.time[start:end] != times):
+                raise ValueError(f"exposure track does not match the timer schedule at cycles {start}-{end}")
+            self._cycle = end
+            return {name: column[start:end] for name, column in track.columns.items()}
+
+        d_block, u_block = block["deriv"], block["under"]
+        d_price = (np.asarray(d_block["ask"], dtype=float) + np.asarray(d_block["bid"], dtype=float))/200
+        return self.model.batch(d_price,
+                                np.asarray(u_block["open"], dtype=float),
+                                self.block_sigma(block),
+                                0,
+                                np.asarray(d_block["tte"], dtype=float),
+                                self.strike)
+
+    def supports_blocks(self) -> bool:
+        """blocks need a model implementing `batch`, unless exposures come from a track"""
+        return self.exposure_track is not None or hasattr(self.model, "batch")
+
+    def consume_block(self, block: dict) -> dict:
+        """`consume` over a block of cycles: exposures of the whole block at once, then the
+        hedging rules in a loop over plain floats. Leaves the same state as consuming each
+        cycle in turn. Needs a model implementing `batch`, unless exposures come from a track
+
+        Returns:
+            dict: exposures & portfolio delta of every cycle, as arrays
+        """
+        if not self.supports_blocks():
+            raise NotImplementedError(f"{type(self).__name__} does not consume blocks")
+
+        d_block, u_block = block["deriv"], block["under"]
+        exposures = self.block_exposures(block)
+        # cached exposures are from before the block
+        self._last_inputs = None
+
+        bid = np.asarray(d_block["bid"], dtype=float)
+        ask = np.asarray(d_block["ask"], dtype=float)
+        closing = np.asarray(d_block["tte"], dtype=float) < self.min_tte_hedge
+        valid = ~(((ask - bid) > 5) | (ask > 95) | (bid < 5))
+
+        portfolio_delta = np.empty(len(bid))
+        rows = zip(np.asarray(block["time"]).tolist(), bid.tolist(), ask.tolist(),
+                   np.asarray(u_block["open"]).tolist(), np.asarray(exposures["delta"]).tolist(),
+                   closing.tolist(), valid.tolist())
+        for i, (time, bid_i, ask_i, u_price, delta, closing_i, valid_i) in enumerate(rows):
+            portfolio_delta[i] = self.deriv_position * delta + self.under_position
+
+            # if close to expiration, zero the hedge and carry the contract to expiration
+            if closing_i:
+                if self.under_position != 0:
+                    quantity = self.clip_quantity(-self.under_position)
+                    if quantity != 0:
+                        self.book_underlying(u_price, quantity)
+
+            elif valid_i:
+                # purchasing a derivative contract if it's not already purchased
+                if self.deriv_position == 0:
+                    self.deriv_position += 1
+                    self.cash -= (ask_i + bid_i)/2
+
+                # rebalancing delta hedge
+                quantity = self.clip_quantity(-(self.deriv_position * delta + self.under_position))
+                if quantity != 0:
+                    self.book_underlying(u_price, quantity)
+
+            if self.curve is not None:
+                d_price = (ask_i + bid_i)/200
+                self.curve.append(time,
+                                  d_price,
+                                  u_price,
+                                  self.equity(d_price, u_price),
+                                  self.reconcile_hedge(u_price),
+                                  self.realized_pnl,
+                                  self.under_position,
+                                  self.deriv_position,
+                                  portfolio_delta[i],
+                                  *(exposures[name][i] for name in EXPOSURE_COLUMNS))
+
+        exposures = dict(exposures)
+        exposures['portfolio_delta'] = portfolio_delta
         return exposures
@@ -0,0 +1,144 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.base import BaseDataFeeder, BaseModel, BaseTimer, BaseEstimator
+from src.exceptions import SimFinished
+from src.models.geom_bm import GBMStepModel
+from src.agents.hedging_agent import HedgingAgent, EXPOSURE_COLUMNS
+
+
+class LadderHedgingAgent(HedgingAgent):
+    """Hedges a ladder of contracts on one underlying with a single, net, underlying hedge.
+
+    Each contract follows `HedgingAgent`'s rules: one contract is bought at the mid the
+    first time its quote is valid, and it is held to expiration, unhedged, once under
+    `min_tte_hedge`. Instead of one agent per strike, the deltas of every live contract come
+    from one `model.batch` call per cycle, and the underlying is only traded to bring the
+    ladder's net delta to zero. Deltas of different strikes offset before trading, so the
+    ladder costs one model call and at most one underlying trade per cycle.
+
+    The hedge is rebalanced when any live contract has a valid quote, or when a contract
+    stops being hedged. `max_under_pos` caps the net hedge. A contract whose delta is
+    undefined (nan iv) keeps being hedged at its last defined delta, and one whose feeder
+    has run out is held unhedged like an expiring one.
+
+    Args:
+        derivative_feeders (Dict[int, BaseDataFeeder]): strike -> contract feeder, all on `timer`
+        model (BaseModel, optional): pricing model, must implement `batch`
+
+    Attributes:
+        strikes (np.ndarray): strikes of the ladder, in the order of `derivative_feeders`
+        deriv_position (np.ndarray): contracts held per strike
+        model_calls (int): batched model evaluations
+    """
+
+    def __init__(self,
+                 derivative_feeders: Dict[int, BaseDataFeeder],
+                 underlying_feeder: BaseDataFeeder,
+                 timer: BaseTimer,
+                 max_under_pos: float = .0005,
+                 min_tte_hedge: float = .15,
+                 model: BaseModel = GBMStepModel,
+                 estimator: Optional[BaseEstimator] = None,
+                 sigma_col: str = "4_hour_sigma_log"
+                 ):
+        if not derivative_feeders:
+            raise ValueError("`derivative_feeders` is empty")
+
+        strikes = np.array(list(derivative_feeders), dtype=float)
+        super().__init__(None, underlying_feeder, timer, strikes,
+                         max_under_pos=max_under_pos,
+                         min_tte_hedge=min_tte_hedge,
+                         model=model,
+                         estimator=estimator,
+                         sigma_col=sigma_col)
+
+        self.deriv_feeders = list(derivative_feeders.values())
+        self.strikes = strikes
+
+        # tracking positions per contract
+        size = len(strikes)
+        self.deriv_position = np.zeros(size)  # in num contracts
+        self.deltas = np.zeros(size)  # last defined delta
+
+        # contracts no longer hedged, expiring or out of data
+        self.closed = np.zeros(size, dtype=bool)
+        self.finished = np.zeros(size, dtype=bool)
+
+        self.model_calls = 0
+
+    def quotes(self) -> Dict[str, np.ndarray]:
+        """bid, ask & tte of every contract, nan for contracts without a quote"""
+        bid, ask, tte = (np.full(len(self.strikes), np.nan) for _ in range(3))
+        for c, feeder in enumerate(self.deriv_feeders):
+            if self.finished[c]:
+                continue
+            try:
+                data = feeder.get()
+            except SimFinished:
+                self.finished[c] = True
+                continue
+            if data is not None:
+                bid[c], ask[c], tte[c] = data["bid"], data["ask"], data["tte"]
+
+        return {"bid": bid, "ask": ask, "tte": tte}
+
+    def portfolio_delta(self, exposures: dict = None) -> float:
+        """net delta of the hedged contracts and the hedge, in shares"""
+        hedged = ~self.closed
+        return self.deriv_position[hedged] @ self.deltas[hedged] + self.under_position
+
+    def equity(self, d_price: np.ndarray, u_price: float) -> float:
+        """cash, contracts at `d_price` (per strike) and hedge P&L at `u_price`, in dollars"""
+        held = self.deriv_position != 0
+        return self.cash/100 + self.deriv_position[held] @ d_price[held] + self.reconcile_hedge(u_price)
+
+    def supports_blocks(self) -> bool:
+        # `HedgingAgent`'s block loop follows scalar state
+        return False
+
+    def consume(self):
+        new_under_data = self.under_feeder.get()
+        quotes = self.quotes()
+        bid, ask, tte = quotes["bid"], quotes["ask"], quotes["tte"]
+
+        # nan comparisons are False, so contracts without a quote are neither closing nor live
+        closing = (tte < self.min_tte_hedge) | self.finished
+        newly_closed = closing & ~self.closed
+        self.closed |= closing
+        live = ~self.closed & (tte > 0)
+
+        # estimators see every cycle, as with `HedgingAgent`
+        estimated_sigma = self.estimate_sigma(new_under_data)
+
+        exposures = {name: np.full(len(self.strikes), np.nan) for name in EXPOSURE_COLUMNS}
+        if live.any():
+            # every live strike in one model evaluation
+            batch = self.model.batch((ask[live] + bid[live])/200,
+                                     new_under_data["open"],
+                                     estimated_sigma,
+                                     0,
+                                     tte[live],
+                                     self.strikes[live])
+            self.model_calls += 1
+            for name in EXPOSURE_COLUMNS:
+                exposures[name][live] = batch[name]
+
+            defined = live & np.isfinite(exposures["delta"])
+            self.deltas[defined] = exposures["delta"][defined]
+
+        # as `HedgingAgent.valid_deriv_data`, per contract
+        valid = live & ((ask - bid) <= 5) & (ask <= 95) & (bid >= 5)
+
+        # purchasing each valid contract not already held, at the mid in cents
+        buying = valid & (self.deriv_position == 0)
+        self.deriv_position[buying] += 1
+        self.cash -= ((ask[buying] + bid[buying])/2).sum()
+
+        # one underlying trade for the whole ladder
+        if valid.any() or newly_closed.any():
+            self.purchase_underlying(new_under_data, -self.portfolio_delta())
+
+        exposures['portfolio_delta'] = self.portfolio_delta()
+        return exposures
@@ -0,0 +1,164 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from src.base import BaseDataFeeder, BaseModel, BaseTimer, BaseEstimator
+from src.models import ExposureTrack
+from src.models.geom_bm import GBMStepModel
+from src.agents.hedging_agent import HedgingAgent
+
+
+def clip_hedge_quantity(quantity: np.ndarray, position: np.ndarray, max_pos: np.ndarray) -> np.ndarray:
+    """Array version of the clipping in `HedgingAgent.purchase_underlying`, limiting trades
+    so the position stays within +/- `max_pos`. Matches the scalar version exactly,
+    including that a nan quantity (undefined delta) takes the selling branch
+    """
+    # quantity > 0: max(min(max_pos - position, quantity), 0)
+    upper = max_pos - position
+    buy = np.where(quantity < upper, quantity, upper)
+    buy = np.where(0 > buy, 0, buy)
+
+    # otherwise: min(max(-max_pos - position, quantity), 0)
+    lower = -max_pos - position
+    sell = np.where(quantity > lower, quantity, lower)
+    sell = np.where(0 < sell, 0, sell)
+
+    return np.where(quantity > 0, buy, sell)
+
+
+class VectorHedgingAgent(HedgingAgent):
+    """Runs `HedgingAgent` for K hyperparameter combinations at once on the same contract.
+
+    Positions, cash and hedge P&L are arrays over the combinations. Exposures are computed
+    once per cycle and the hedging rules are applied as array operations, so a single replay
+    of a contract gives terminal values for a whole grid. Underlying orders are kept as
+    running totals per combination (cost, cost basis, realized P&L & turnover) rather than
+    a list, booked as `HedgingAgent.book_underlying` does.
+
+    Args:
+        max_under_pos (Union[float, Sequence[float]]): maximum magnitude of delta hedge in shares
+        min_tte_hedge (Union[float, Sequence[float]]): no rebalancing below this time to expiration
+            both are broadcast against each other to K combinations
+    """
+
+    def __init__(self,
+                 derivative_feeder: BaseDataFeeder,
+                 underlying_feeder: BaseDataFeeder,
+                 timer: BaseTimer,
+                 strike: float,
+                 max_under_pos: Union[float, Sequence[float]] = .0005,
+                 min_tte_hedge: Union[float, Sequence[float]] = .15,
+                 model: BaseModel = GBMStepModel,
+                 estimator: Optional[BaseEstimator] = None,
+                 sigma_col: str = "4_hour_sigma_log",
+                 exposure_track: Optional[ExposureTrack] = None
+                 ):
+        max_under_pos, min_tte_hedge = np.broadcast_arrays(
+            np.asarray(max_under_pos, dtype=float), np.asarray(min_tte_hedge, dtype=float))
+        if max_under_pos.ndim != 1:
+            raise ValueError("`max_under_pos` and `min_tte_hedge` must broadcast to 1 dimension")
+
+        super().__init__(derivative_feeder, underlying_feeder, timer, strike,
+                         max_under_pos=max_under_pos.copy(),
+                         min_tte_hedge=min_tte_hedge.copy(),
+                         model=model,
+                         estimator=estimator,
+                         sigma_col=sigma_col,
+                         exposure_track=exposure_track)
+
+        # tracking positions per combination
+        size = len(self.max_under_pos)
+        self.under_position = np.zeros(size)  # in num shares
+        self.deriv_position = np.zeros(size)  # in num contracts
+        self.cash = np.zeros(size)  # in cents
+
+        # running totals of underlying orders
+        self.under_cost = np.zeros(size)
+        self.cost_basis = np.zeros(size)
+        self.realized_pnl = np.zeros(size)
+        self.under_turnover = np.zeros(size)
+
+    @property
+    def size(self) -> int:
+        """number of parameter combinations"""
+        return len(self.max_under_pos)
+
+    def close_to_expiration(self, data: dict) -> np.ndarray:
+        return data['tte'] < self.min_tte_hedge
+
+    def purchase_deriv(self, data: dict, mask: np.ndarray) -> None:
+        buying = mask & (self.deriv_position == 0)
+
+        # assume execution at mid-market price, in cents
+        execution_price = (data['ask'] + data['bid'])/2
+
+        # updating portfolio
+        self.deriv_position[buying] += 1
+        self.cash[buying] -= execution_price
+
+    def purchase_underlying(self, data: dict, quantity: np.ndarray, mask: np.ndarray) -> None:
+        quantity = clip_hedge_quantity(quantity, self.under_position, self.max_under_pos)
+        trading = mask & (quantity != 0)
+
+        self.book_underlying(data['open'], quantity[trading], trading)
+
+    def book_underlying(self, exec_price: float, quantity: np.ndarray, trading: np.ndarray) -> None:
+        """array version of `HedgingAgent.book_underlying`, for the combinations in `trading`"""
+        position = self.under_position[trading]
+        cost_basis = self.cost_basis[trading]
+
+        # the part closing the position realizes against its average price, any remainder
+        # opens a new position at the execution price
+        opening = (position == 0) | ((position > 0) == (quantity > 0))
+        closed = np.where(np.abs(quantity) < np.abs(position), quantity, -position)
+        closing_all = ~opening & (closed == -position)
+        reducing = ~opening & ~closing_all
+        average_price = np.divide(cost_basis, position, out=np.zeros_like(cost_basis), where=reducing)
+
+        realized_pnl = np.where(closing_all, position * exec_price - cost_basis,
+                                np.where(reducing, -closed * (exec_price - average_price), 0))
+        self.realized_pnl[trading] += realized_pnl
+        self.cost_basis[trading] = np.where(opening, cost_basis + quantity * exec_price,
+                                            np.where(closing_all, (quantity - closed) * exec_price,
+                                                     cost_basis + closed * average_price))
+
+        self.under_cost[trading] += quantity * exec_price
+        self.under_turnover[trading] += np.abs(quantity)
+        self.under_position[trading] += quantity
+
+    def rebalance_hedge(self, u_data: dict, exposures: dict, mask: np.ndarray) -> None:
+        portfolio_delta = self.portfolio_delta(exposures)
+        self.purchase_underlying(u_data, -portfolio_delta, mask)
+
+    def zero_hedge(self, u_data: dict, mask: np.ndarray) -> None:
+        self.purchase_underlying(u_data, -self.under_position, mask)
+
+    def reconcile_hedge(self, u_price) -> np.ndarray:
+        return u_price * self.under_position - self.under_cost
+
+    def supports_blocks(self) -> bool:
+        # `HedgingAgent`'s block loop follows scalar state
+        return False
+
+    def consume(self):
+        new_deriv_data = self.deriv_feeder.get()
+        new_under_data = self.under_feeder.get()
+
+        # exposures are shared by every combination, computed once
+        exposures = self.model_exposures(new_deriv_data, new_under_data)
+        exposures['portfolio_delta'] = self.portfolio_delta(exposures)
+
+        # if close to expiration, zero the hedge and carry the contract to expiration
+        closing = self.close_to_expiration(new_deriv_data)
+        self.zero_hedge(new_under_data, closing & (self.under_position != 0))
+
+        if self.valid_deriv_data(new_deriv_data):
+            hedging = ~closing
+
+            # purchasing a derivative contract if it's not already purchased
+            self.purchase_deriv(new_deriv_data, hedging)
+
+            # rebalancing delta hedge
+            self.rebalance_hedge(new_under_data, exposures, hedging)
+
+        return exposures
@@ -1 +1,8 @@
 from .linked_feeders import FeederCreator
+from .sweep_runner import SweepRunner
+from .result_store import ResultStore
+from .search import SuccessiveHalving
+from .incremental import IncrementalBacktest
+from .work_queue import WorkQueue
+from .batch_engine import BatchEngine
+from .block_driver import BlockDriver
@@ -0,0 +1,206 @@
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.agents.vector_hedging_agent import clip_hedge_quantity
+from src.base import BaseModel
+from src.data_loaders import LazyLoader
+from src.models.geom_bm import GBMStepModel
+from src.backtester.linked_feeders import FeederCreator
+
+
+def forward_fill_rows(times: np.ndarray, sim_times: np.ndarray) -> np.ndarray:
+    """index of the row a `SimDataFeeder` returns at each of `sim_times`: the last row with
+    time <= sim time. -1 where no row has arrived yet
+    """
+    return np.searchsorted(times, sim_times, side='right') - 1
+
+
+class BatchEngine:
+    """Simulates the hedging strategy of `HedgingAgent` for many contracts in lockstep,
+    as array operations over (contracts x parameter combinations) instead of one timer,
+    feeder pair, agent and python loop per contract.
+
+    Contracts are laid out on one cycle grid: at cycle k each contract's feeders are at
+    `history_start + k * timedelta`, as with its own `DeltaTimer`. Data is forward filled
+    to that grid with `searchsorted`, and each contract finishes at the first cycle where
+    either series runs out, as its feeders would raise `SimFinished`. Exposures only depend
+    on the data so they are computed once, with the model's `batch`, and `run` can be
+    called for any number of parameter combinations.
+
+    Terminal values are identical to running `HedgingAgent` on each contract with a
+    `DeltaTimer(timedelta)` and scoring it with `hedge_terminal_value`. Volatility is read
+    from `sigma_col`, online estimators are not supported.
+
+    Args:
+        histories (List[Tuple[pd.DataFrame, pd.DataFrame, Dict]]): per contract: contract data,
+            underlying data & metadata, as returned by `FeederCreator.contract_window`
+        timedelta (int, optional): seconds per cycle
+        model (BaseModel, optional): pricing model, must implement `batch`
+        sigma_col (str, optional): precomputed volatility column of the underlying data
+    """
+
+    def __init__(self,
+                 histories: List[Tuple[pd.DataFrame, pd.DataFrame, Dict]],
+                 timedelta: int = 60,
+                 model: BaseModel = GBMStepModel,
+                 sigma_col: str = "4_hour_sigma_log"):
+        if not histories:
+            raise ValueError("`histories` is empty")
+
+        self.timedelta = timedelta
+        self.model = model
+        self.sigma_col = sigma_col
+        self.meta_data = [meta_data for _, _, meta_data in histories]
+
+        # cycle at which each contract finishes, the first where either series is used up
+        last_times = np.array([min(data["ts"].iloc[-1], u_data["ts"].iloc[-1])
+                               for data, u_data, _ in histories], dtype=float)
+        history_starts = np.array([meta_data["history_start"] for meta_data in self.meta_data])
+        spans = last_times - history_starts
+        cycles = int(np.max(spans) // timedelta) + 2
+
+        # timer time after each cycle, accumulated as `DeltaTimer` does
+        timer_times = np.cumsum(np.full(cycles, timedelta))
+        sim_times = timer_times[None, :] + history_starts[:, None]
+        self.finish = np.argmax(sim_times >= last_times[:, None], axis=1)
+
+        # cycles before finishing, where the agent consumes data
+        self.active = np.arange(cycles)[None, :] < self.finish[:, None]
+        self.cycles = int(self.finish.max())
+        self.active = self.active[:, :self.cycles]
+        sim_times = sim_times[:, :self.cycles]
+
+        # data forward filled to the cycle grid
+        shape = self.active.shape
+        self.ask = np.zeros(shape)
+        self.bid = np.zeros(shape)
+        self.tte = np.zeros(shape)
+        self.u_open = np.zeros(shape)
+        self.sigma = np.zeros(shape)
+        for c, (data, u_data, _) in enumerate(histories):
+            active = self.active[c]
+            d_rows = forward_fill_rows(data["ts"].to_numpy(), sim_times[c, active])
+            u_rows = forward_fill_rows(u_data["ts"].to_numpy(), sim_times[c, active])
+            if np.any(d_rows < 0) or np.any(u_rows < 0):
+                raise ValueError("contract history starts after its first cycle")
+
+            self.ask[c, active] = data["ask"].to_numpy(dtype=float)[d_rows]
+            self.bid[c, active] = data["bid"].to_numpy(dtype=float)[d_rows]
+            self.tte[c, active] = data["tte"].to_numpy(dtype=float)[d_rows]
+            self.u_open[c, active] = u_data["open"].to_numpy(dtype=float)[u_rows]
+            self.sigma[c, active] = u_data[sigma_col].to_numpy(dtype=float)[u_rows]
+
+        # exposures of every active cell in one model evaluation per contract
+        self.delta = np.zeros(shape)
+        for c, meta_data in enumerate(self.meta_data):
+            active = self.active[c]
+            exposures = model.batch(
+                (self.ask[c, active] + self.bid[c, active])/200,
+                self.u_open[c, active],
+                self.sigma[c, active],
+                0,
+                self.tte[c, active],
+                meta_data["strike"])
+            self.delta[c, active] = exposures["delta"]
+
+        self.valid = ~(((self.ask - self.bid) > 5) | (self.ask > 95) | (self.bid < 5))
+        self.terminal_u_price = np.array([meta_data["terminal_u_price"] for meta_data in self.meta_data],
+                                         dtype=float)
+        self.outcome = np.array([meta_data["outcome"] for meta_data in self.meta_data], dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.meta_data)
+
+    @classmethod
+    def from_date(cls,
+                  loader: LazyLoader,
+                  under_data: pd.DataFrame,
+                  date: str,
+                  min_data_points: int = 3000,
+                  **kwargs) -> "BatchEngine":
+        """engine over every contract of `date` with at least `min_data_points` rows"""
+        histories = []
+        for date_, strike, data in loader.iterate(date):
+            if len(data) < min_data_points:
+                continue
+            active_u_data, meta_data = FeederCreator.contract_window(date_, strike, data, under_data)
+            histories.append((data, active_u_data, meta_data))
+
+        return cls(histories, **kwargs)
+
+    def run(self,
+            max_under_pos: Union[float, Sequence[float]] = .0005,
+            min_tte_hedge: Union[float, Sequence[float]] = .15) -> np.ndarray:
+        """runs the strategy for K parameter combinations, broadcast against each other
+
+        Returns:
+            np.ndarray: terminal values, (contracts x K)
+        """
+        max_under_pos, min_tte_hedge = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(max_under_pos, dtype=float)),
+            np.atleast_1d(np.asarray(min_tte_hedge, dtype=float)))
+        if max_under_pos.ndim != 1:
+            raise ValueError("`max_under_pos` and `min_tte_hedge` must broadcast to 1 dimension")
+
+        shape = (len(self), len(max_under_pos))
+        under_position = np.zeros(shape)
+        under_cost = np.zeros(shape)
+        deriv_position = np.zeros(shape)
+        max_pos = np.broadcast_to(max_under_pos, shape)
+
+        def purchase_underlying(quantity: np.ndarray, mask: np.ndarray, u_price: np.ndarray) -> None:
+            quantity = clip_hedge_quantity(quantity, under_position, max_pos)
+            trading = mask & (quantity != 0)
+
+            # running totals of quantity * exec price, as `HedgingAgent.book_underlying`
+            fill = np.broadcast_to(u_price, shape)[trading]
+            quantity = quantity[trading]
+            under_cost[trading] += quantity * fill
+            under_position[trading] += quantity
+
+        for t in range(self.cycles):
+            active = self.active[:, t, None]
+            u_price = self.u_open[:, t, None]
+
+            # if close to expiration, zero the hedge and carry the contract to expiration
+            closing = self.tte[:, t, None] < min_tte_hedge
+            purchase_underlying(-under_position, active & closing & (under_position != 0), u_price)
+
+            hedging = active & ~closing & self.valid[:, t, None]
+
+            # purchasing a derivative contract if it's not already purchased. cash doesn't
+            # enter the terminal value so isn't tracked
+            deriv_position[hedging & (deriv_position == 0)] += 1
+
+            # rebalancing delta hedge
+            portfolio_delta = deriv_position * self.delta[:, t, None] + under_position
+            purchase_underlying(-portfolio_delta, hedging, u_price)
+
+        # hedge marked at the terminal price, as `HedgingAgent.reconcile_hedge`
+        hedge_pnl = self.terminal_u_price[:, None] * under_position - under_cost
+        return hedge_pnl + self.outcome[:, None]
+
+    def results(self,
+                max_under_pos: Union[float, Sequence[float]] = .0005,
+                min_tte_hedge: Union[float, Sequence[float]] = .15) -> pd.DataFrame:
+        """`run` as one row per (contract, combination) with date, strike, parameters,
+        cycles consumed and terminal value
+        """
+        max_under_pos, min_tte_hedge = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(max_under_pos, dtype=float)),
+            np.atleast_1d(np.asarray(min_tte_hedge, dtype=float)))
+        values = self.run(max_under_pos, min_tte_hedge)
+
+        rows = []
+        for c, meta_data in enumerate(self.meta_data):
+            for k in range(len(max_under_pos)):
+                rows.append({"date": meta_data["date"],
+                             "strike": meta_data["strike"],
+                             "max_under_pos": max_under_pos[k],
+                             "min_tte_hedge": min_tte_hedge[k],
+                             "cycles": int(self.finish[c]),
+                             "terminal_value": values[c, k]})
+
+        return pd.DataFrame(rows)
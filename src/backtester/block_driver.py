@@ -0,0 +1,102 @@
+from typing import Callable, Dict, Generator
+
+import numpy as np
+import pandas as pd
+
+from src.base import BaseAgent, BaseTimer
+from src.backtester.batch_engine import forward_fill_rows
+from src.backtester.linked_feeders import FeederCreator
+from src.backtester.sweep_runner import hedge_terminal_value, run_contract
+
+
+class BlockDriver:
+    """Replays one contract to an agent in blocks of cycles through `consume_block`, instead
+    of one `consume` call per timer cycle.
+
+    Cycles are laid out as with a `DeltaTimer(timedelta)` linked to the contract's feeders,
+    as `BatchEngine` does: data is forward filled to each cycle with `searchsorted`, and the
+    replay stops at the first cycle where either series runs out, where the feeders would
+    raise `SimFinished`. Agents consuming blocks end in the same state as when cycled.
+
+    Args:
+        data (pd.DataFrame): contract data, as returned by `LazyLoader.query`
+        u_data (pd.DataFrame): underlying data & metadata, as returned by `FeederCreator.contract_window`
+        meta_data (Dict): contract metadata
+        timedelta (int, optional): seconds per cycle
+        block_size (int, optional): cycles per block
+    """
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 u_data: pd.DataFrame,
+                 meta_data: Dict,
+                 timedelta: int = 60,
+                 block_size: int = 4096):
+        if block_size < 1:
+            raise ValueError("`block_size` must be positive")
+
+        self.meta_data = meta_data
+        self.timedelta = timedelta
+        self.block_size = block_size
+
+        # timer time after each cycle, accumulated as `DeltaTimer` does, up to the first
+        # cycle where either series is used up
+        history_start = meta_data["history_start"]
+        last_time = min(data["ts"].iloc[-1], u_data["ts"].iloc[-1])
+        cycles = int((last_time - history_start) // timedelta) + 2
+        times = np.cumsum(np.full(cycles, timedelta))
+        sim_times = times + history_start
+        finish = int(np.argmax(sim_times >= last_time))
+        self.time = times[:finish]
+        self.sim_time = sim_times[:finish]
+
+        d_rows = forward_fill_rows(data["ts"].to_numpy(), self.sim_time)
+        u_rows = forward_fill_rows(u_data["ts"].to_numpy(), self.sim_time)
+        if np.any(d_rows < 0) or np.any(u_rows < 0):
+            raise ValueError("contract history starts after its first cycle")
+
+        # numeric columns of the rows each feeder returns at every cycle
+        self.deriv = {name: column.to_numpy()[d_rows] for name, column in data.select_dtypes("number").items()}
+        self.under = {name: column.to_numpy()[u_rows] for name, column in u_data.select_dtypes("number").items()}
+
+    def __len__(self) -> int:
+        """number of cycles"""
+        return len(self.time)
+
+    @classmethod
+    def from_history(cls,
+                     date: str,
+                     strike: int,
+                     data: pd.DataFrame,
+                     under_data: pd.DataFrame,
+                     **kwargs) -> "BlockDriver":
+        """driver over one contract, the underlying cut to its life"""
+        active_u_data, meta_data = FeederCreator.contract_window(date, strike, data, under_data)
+        return cls(data, active_u_data, meta_data, **kwargs)
+
+    def blocks(self) -> Generator[Dict, None, None]:
+        """consecutive blocks of at most `block_size` cycles, in the form `consume_block` takes"""
+        for start in range(0, len(self), self.block_size):
+            end = start + self.block_size
+            yield {"time": self.time[start:end],
+                   "sim_time": self.sim_time[start:end],
+                   "deriv": {name: column[start:end] for name, column in self.deriv.items()},
+                   "under": {name: column[start:end] for name, column in self.under.items()}}
+
+    def run(self,
+            agent: BaseAgent,
+            timer: BaseTimer,
+            terminal_value: Callable[[BaseAgent, Dict], float] = hedge_terminal_value) -> float:
+        """runs an agent over the contract, block by block when it `supports_blocks`.
+        Other agents are cycled as usual, so `agent` must be built on started feeders linked
+        to `timer`, a `DeltaTimer(timedelta)`
+
+        Returns:
+            float: `terminal_value` of the agent once finished
+        """
+        if not agent.supports_blocks():
+            return run_contract(agent, timer, self.meta_data, terminal_value)
+
+        for block in self.blocks():
+            agent.consume_block(block)
+        return terminal_value(agent, self.meta_data)
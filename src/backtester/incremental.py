@@ -0,0 +1,175 @@
+import copy
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Set, Tuple, Union
+
+import pandas as pd
+
+from src.data_loaders import LazyLoader
+from src.backtester.statistics import QuantileSketch, RunningStats
+from src.backtester.result_store import ResultStore, qualified_name
+from src.backtester.sweep_runner import SweepRunner
+
+
+def _contract_id(date: str, strike: int) -> str:
+    return f"{date}/{strike}"
+
+
+class IncrementalBacktest:
+    """Keeps a sweep's aggregate statistics up to date as new contracts arrive, simulating
+    only contracts a parameter combination has not yet covered.
+
+    For every combination the state file holds the contracts already merged, running
+    count/mean/var and a quantile sketch of terminal values. `update` diffs the contracts on
+    disk against that, simulates what is missing through the runner (so a `ResultStore` on
+    the runner is still used) and merges the new values in. Row counts are only taken for
+    contracts not seen before and contracts too short to run are remembered, so a nightly
+    update costs in proportion to the newly arrived data rather than the full history.
+
+    Contracts are treated as final once seen, a contract file that changes afterwards is not
+    re-simulated. Aggregates are keyed by agent, parameters, model, timer and terminal value
+    function but not by source code, start a new state file to rebuild them after a change
+    in behavior.
+
+    Args:
+        runner (SweepRunner): sweep over the parameter grid to maintain
+        path (Union[str, Path]): json file holding the aggregate state
+        quantiles (Sequence[float], optional): quantiles reported by `results`
+        compression (float, optional): accuracy of the quantile sketches, see `QuantileSketch`
+    """
+
+    def __init__(self,
+                 runner: SweepRunner,
+                 path: Union[str, Path],
+                 quantiles: Sequence[float] = (.05, .5, .95),
+                 compression: float = 100):
+        self.runner = runner
+        self.path = Path(path)
+        self.quantiles = quantiles
+        self.compression = compression
+
+        # contract simulations run by the last `update`
+        self.simulations = 0
+
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._short: Set[str] = set()
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            if state["min_data_points"] == runner.min_data_points:
+                self._short = set(state["short"])
+            self._configs = state["configs"]
+
+    def config_key(self, i: int) -> str:
+        """state key of the runner's parameter combination `i`"""
+        runner = self.runner
+        return ResultStore.key(
+            agent=qualified_name(runner.agent_factory),
+            params=runner.params[i],
+            model=qualified_name(runner.model),
+            timer={"timedelta": runner.timedelta},
+            terminal_value=qualified_name(runner.terminal_value))
+
+    def _config(self, i: int) -> Dict[str, Any]:
+        key = self.config_key(i)
+        if key not in self._configs:
+            self._configs[key] = {"params": self.runner.params[i],
+                                  "covered": [],
+                                  "stats": RunningStats().to_dict(),
+                                  "sketch": QuantileSketch(self.compression).to_dict()}
+        return self._configs[key]
+
+    def pending(self) -> Dict[int, List[Tuple[str, int]]]:
+        """contracts still to be simulated, by index of parameter combination"""
+        loader = LazyLoader(Path(self.runner.deriv_data_path))
+        available = [(date, strike) for date, strike in loader.contracts()
+                     if _contract_id(date, strike) not in self._short]
+
+        covered = [set(self._config(i)["covered"]) for i in range(len(self.runner.params))]
+        unseen = [contract for contract in available
+                  if any(_contract_id(*contract) not in seen for seen in covered)]
+
+        # only contracts nobody has covered yet need their rows counted
+        long_enough = set(self.runner.contracts(unseen))
+        for contract in unseen:
+            if contract not in long_enough:
+                self._short.add(_contract_id(*contract))
+
+        return {i: [contract for contract in unseen
+                    if contract in long_enough and _contract_id(*contract) not in seen]
+                for i, seen in enumerate(covered)}
+
+    def update(self, progress: bool = True) -> pd.DataFrame:
+        """simulates pending contracts, merges them into the aggregates & saves the state
+
+        Returns:
+            pd.DataFrame: `results` after the update
+        """
+        # combinations missing the same contracts are simulated together
+        groups: Dict[Tuple[Tuple[str, int], ...], List[int]] = {}
+        for i, missing in self.pending().items():
+            if missing:
+                groups.setdefault(tuple(missing), []).append(i)
+
+        self.simulations = 0
+        for missing, indices in groups.items():
+            runner = copy.copy(self.runner)
+            runner.params = [self.runner.params[i] for i in indices]
+
+            new_stats = [RunningStats() for _ in indices]
+            new_sketches = [QuantileSketch(self.compression) for _ in indices]
+            new_covered: List[List[str]] = [[] for _ in indices]
+            for date, strike, j, value in runner.iter_indexed(list(missing), progress):
+                new_stats[j].add(value)
+                new_sketches[j].add(value)
+                new_covered[j].append(_contract_id(date, strike))
+                self.simulations += 1
+
+            for j, i in enumerate(indices):
+                config = self._config(i)
+                stats = RunningStats.from_dict(config["stats"])
+                stats.merge(new_stats[j])
+                sketch = QuantileSketch.from_dict(config["sketch"])
+                sketch.merge(new_sketches[j])
+
+                config["stats"] = stats.to_dict()
+                config["sketch"] = sketch.to_dict()
+                config["covered"].extend(new_covered[j])
+
+        self.save()
+        return self.results()
+
+    def save(self) -> None:
+        """writes the state, atomically replacing the previous file"""
+        state = {"min_data_points": self.runner.min_data_points,
+                 "short": sorted(self._short),
+                 "configs": self._configs}
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(state, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def results(self) -> pd.DataFrame:
+        """one row per parameter combination of the runner with its parameters, the mean,
+        var and count of terminal values over covered contracts and the requested quantiles
+        """
+        rows = []
+        for i, params in enumerate(self.runner.params):
+            config = self._config(i)
+            stats = RunningStats.from_dict(config["stats"])
+            sketch = QuantileSketch.from_dict(config["sketch"])
+
+            row = dict(params)
+            row["mean"] = stats.mean if stats.count else float("nan")
+            row["var"] = stats.var
+            row["count"] = stats.count
+            for q in self.quantiles:
+                row[f"q{100 * q:g}"] = sketch.quantile(q)
+            rows.append(row)
+
+        return pd.DataFrame(rows)
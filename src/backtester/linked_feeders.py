@@ -1,12 +1,17 @@
 from pathlib import Path
-from typing import Generator, Literal, Dict, List, Tuple
+from typing import Callable, Generator, Literal, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import datetime as dt
 from matplotlib import pyplot as plt
 
+from src.base import BaseDataFeeder
 from src.data_feeder.sim_data_feeder import SimDataFeeder
-from src.timers import DeltaTimer
+from src.data_feeder.column_feeder import ColumnFeeder
+from src.data_feeder.snapshot_feeder import SnapshotFeeder
+from src.base import BaseTimer
+from src.timers import DeltaTimer, AdaptiveTimer
 from src.data_loaders import LazyLoader
 
 
@@ -23,52 +28,271 @@ class FeederCreator:
 
         return {"time": time, "value": value}
 
+    @staticmethod
+    def contract_window(date: str,
+                        strike: int,
+                        data: pd.DataFrame,
+                        under_data: pd.DataFrame
+                        ) -> Tuple[pd.DataFrame, Dict]:
+        """underlying data covering a contract's life and the contract's metadata
+
+        Args:
+            date (str): contract date
+            strike (int): contract strike
+            data (pd.DataFrame): contract data, as returned by `LazyLoader.query`
+            under_data (pd.DataFrame): underlying data covering the contract's life
+
+        Returns:
+            Tuple[pd.DataFrame, Dict]: active underlying data, metadata
+        """
+        #  grabbing relevant underlying data
+        hist_start = data["ts"].min()
+        expiration_ts = data["ts"][0] + (data["tte"][0]*3600)
+        active_u_data = under_data[(
+            under_data["ts"] <= expiration_ts + 600) & (under_data['ts'] >= hist_start)]
+
+        # compiling metadata
+        terminal_u_price = active_u_data[active_u_data["ts"]
+                                         <= expiration_ts]["close"].values[-1]
+        outcome = terminal_u_price >= int(strike)
+
+        meta_data = {"strike": strike,
+                     "terminal_u_price": terminal_u_price,
+                     "outcome": outcome,
+                     "date": date,
+                     "data_points": len(data),
+                     "expiration_ts": expiration_ts,
+                     "history_start": active_u_data['ts'].min()}
+
+        return active_u_data, meta_data
+
+    @classmethod
+    def contract_history(cls,
+                         date: str,
+                         strike: int,
+                         data: pd.DataFrame,
+                         under_data: pd.DataFrame
+                         ) -> Tuple[Dict, Dict, Dict]:
+        """feeder histories and metadata for one contract
+
+        Args:
+            date (str): contract date
+            strike (int): contract strike
+            data (pd.DataFrame): contract data, as returned by `LazyLoader.query`
+            under_data (pd.DataFrame): underlying data covering the contract's life
+
+        Returns:
+            Tuple[Dict, Dict, Dict]: derivative history, underlying history, metadata
+        """
+        active_u_data, meta_data = cls.contract_window(date, strike, data, under_data)
+
+        d_hist_dict = cls.make_feeder_feeder(data)
+        u_hist_dict = cls.make_feeder_feeder(active_u_data)
+
+        return d_hist_dict, u_hist_dict, meta_data
+
+    @staticmethod
+    def contract_columns(date: str,
+                         strike: int,
+                         columns: Dict[str, np.ndarray],
+                         u_columns: Dict[str, np.ndarray]
+                         ) -> Tuple[Dict, Dict, Dict]:
+        """as `contract_history` for data held in columns, `SharedStore.columns` views for
+        example. The histories are the columns themselves and the underlying window is a
+        slice of them, nothing is copied. Underlying "ts" must be sorted
+
+        Returns:
+            Tuple[Dict, Dict, Dict]: derivative columns, underlying columns, metadata
+        """
+        hist_start = columns["ts"].min()
+        expiration_ts = columns["ts"][0] + (columns["tte"][0]*3600)
+
+        u_ts = u_columns["ts"]
+        first = np.searchsorted(u_ts, hist_start, side="left")
+        last = np.searchsorted(u_ts, expiration_ts + 600, side="right")
+        active_u_columns = {name: column[first:last] for name, column in u_columns.items()}
+
+        terminal_row = np.searchsorted(u_ts, expiration_ts, side="right") - 1
+        terminal_u_price = u_columns["close"][terminal_row]
+
+        meta_data = {"strike": strike,
+                     "terminal_u_price": terminal_u_price,
+                     "outcome": terminal_u_price >= int(strike),
+                     "date": date,
+                     "data_points": len(columns["ts"]),
+                     "expiration_ts": expiration_ts,
+                     "history_start": active_u_columns["ts"].min()}
+
+        return columns, active_u_columns, meta_data
+
+    @staticmethod
+    def _feeder(history_start: float, history_end: float, history: Dict, timer: BaseTimer) -> BaseDataFeeder:
+        # row dict histories have "time" & "value", column histories a "ts" column
+        if "ts" in history:
+            return ColumnFeeder(history_start, history_end, history, timer)
+        return SimDataFeeder(history_start, history_end, history, timer)
+
+    @staticmethod
+    def link(d_hist_dict: Dict,
+             u_hist_dict: Dict,
+             meta_data: Dict,
+             timedelta: int = 60,
+             timer_factory: Optional[Callable[[], BaseTimer]] = None,
+             snapshot: bool = False
+             ) -> Tuple[BaseDataFeeder, BaseDataFeeder, BaseTimer, Dict]:
+        """creates fresh feeders linked by a new timer from a contract's histories. Histories
+        are copied by the feeders, or only read for column histories from `contract_columns`,
+        so the same histories can be linked many times
+        """
+        # making timer to link feeders
+        timer = DeltaTimer(timedelta) if timer_factory is None else timer_factory()
+
+        history_start = meta_data["history_start"]
+        expiration_ts = meta_data["expiration_ts"]
+        under_feeder = FeederCreator._feeder(
+            history_start, expiration_ts, u_hist_dict, timer)
+        deriv_feeder = FeederCreator._feeder(
+            history_start, expiration_ts, d_hist_dict, timer)
+
+        if snapshot:
+            under_feeder = SnapshotFeeder(under_feeder, timer)
+            deriv_feeder = SnapshotFeeder(deriv_feeder, timer)
+
+        if isinstance(timer, AdaptiveTimer):
+            timer.bind(under_feeder, int(meta_data["strike"]), expiration_ts)
+
+        return deriv_feeder, under_feeder, timer, meta_data
+
     @classmethod
     def iterate(cls,
                 deriv_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_data/step",
                 under_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_underlying.csv",
-                timedelta: int = 60
-                ) -> Generator[Tuple[SimDataFeeder, SimDataFeeder, DeltaTimer, Dict]]:
+                timedelta: int = 60,
+                timer_factory: Optional[Callable[[], BaseTimer]] = None,
+                snapshot: bool = False,
+                min_data_points: int = 3000
+                ) -> Generator[Tuple[BaseDataFeeder, BaseDataFeeder, BaseTimer, Dict]]:
+        """yields linked feeders for every contract with enough data
+
+        Args:
+            timedelta (int, optional): seconds per cycle of the default `DeltaTimer`
+            timer_factory (Optional[Callable[[], BaseTimer]], optional): creates the timer for
+                each contract instead of `DeltaTimer(timedelta)`. An `AdaptiveTimer` is bound
+                to the contract's underlying feeder, strike and expiration
+            snapshot (bool, optional): wrap feeders in `SnapshotFeeder` so each resolves at
+                most once per cycle no matter how many consumers read it
+            min_data_points (int, optional): contracts with fewer rows are skipped
+        """
         loader = LazyLoader(Path(deriv_data_path))
         under_data = pd.read_csv(under_data_path)
 
         for date, strike, data in loader.iterate():
             #  auto-skip short data
-            if len(data) < 3000:
+            if len(data) < min_data_points:
                 continue
 
-            #  grabbing relevant underlying data
-            hist_start = data["ts"].min()
-            expiration_ts = data["ts"][0] + (data["tte"][0]*3600)
-            active_u_data = under_data[(
-                under_data["ts"] <= expiration_ts + 600) & (under_data['ts'] >= hist_start)]
+            d_hist_dict, u_hist_dict, meta_data = cls.contract_history(
+                date, strike, data, under_data)
+
+            yield cls.link(d_hist_dict, u_hist_dict, meta_data, timedelta, timer_factory, snapshot)
+
+    @classmethod
+    def ladder_history(cls,
+                       date: str,
+                       contracts: List[Tuple[int, pd.DataFrame]],
+                       under_data: pd.DataFrame
+                       ) -> Tuple[Dict[int, Dict], Dict, Dict]:
+        """feeder histories and metadata for a ladder of contracts sharing one underlying
+
+        Args:
+            date (str): contracts date
+            contracts (List[Tuple[int, pd.DataFrame]]): strike & contract data of each contract
+            under_data (pd.DataFrame): underlying data covering the contracts' lives
+
+        Returns:
+            Tuple[Dict[int, Dict], Dict, Dict]: strike -> derivative history, underlying
+                history covering every contract, ladder metadata with each contract's under
+                "contracts"
+        """
+        contract_meta = [cls.contract_window(date, strike, data, under_data)[1]
+                         for strike, data in contracts]
 
-            # making timer to link feeders
-            timer = DeltaTimer(timedelta)
+        history_start = min(meta_data["history_start"] for meta_data in contract_meta)
+        expiration_ts = max(meta_data["expiration_ts"] for meta_data in contract_meta)
+        active_u_data = under_data[(
+            under_data["ts"] <= expiration_ts + 600) & (under_data['ts'] >= history_start)]
 
-            # underlying feeder
-            u_hist_dict = cls.make_feeder_feeder(active_u_data)
-            under_feeder = SimDataFeeder(
-                active_u_data['ts'].min(), expiration_ts, u_hist_dict, timer)
+        meta_data = {"strikes": [meta_data["strike"] for meta_data in contract_meta],
+                     "outcomes": [meta_data["outcome"] for meta_data in contract_meta],
+                     "terminal_u_price": active_u_data[active_u_data["ts"] <= expiration_ts]["close"].values[-1],
+                     "date": date,
+                     "expiration_ts": expiration_ts,
+                     "history_start": history_start,
+                     "contracts": contract_meta}
 
-            # deriv feeder
-            d_hist_dict = cls.make_feeder_feeder(data)
-            deriv_feeder = SimDataFeeder(
-                active_u_data['ts'].min(), expiration_ts, d_hist_dict, timer)
+        d_hist_dicts = {strike: cls.make_feeder_feeder(data) for strike, data in contracts}
+        u_hist_dict = cls.make_feeder_feeder(active_u_data)
 
-            # compiling metadata
-            terminal_u_price = active_u_data[active_u_data["ts"]
-                                             <= expiration_ts]["close"].values[-1]
-            outcome = terminal_u_price >= int(strike)
+        return d_hist_dicts, u_hist_dict, meta_data
+
+    @staticmethod
+    def link_ladder(d_hist_dicts: Dict[int, Dict],
+                    u_hist_dict: Dict,
+                    meta_data: Dict,
+                    timedelta: int = 60,
+                    timer_factory: Optional[Callable[[], BaseTimer]] = None,
+                    snapshot: bool = False
+                    ) -> Tuple[Dict[int, BaseDataFeeder], BaseDataFeeder, BaseTimer, Dict]:
+        """as `link`, for a ladder: one timer, one underlying feeder and a feeder per strike.
+        Every feeder starts at the ladder's earliest history, contracts starting later
+        return None until their first quote. An `AdaptiveTimer` is bound to the middle strike
+        """
+        timer = DeltaTimer(timedelta) if timer_factory is None else timer_factory()
+
+        history_start = meta_data["history_start"]
+        under_feeder = SimDataFeeder(
+            history_start, meta_data["expiration_ts"], u_hist_dict, timer)
+        deriv_feeders = {}
+        for contract_meta in meta_data["contracts"]:
+            strike = contract_meta["strike"]
+            deriv_feeders[strike] = SimDataFeeder(
+                history_start, contract_meta["expiration_ts"], d_hist_dicts[strike], timer)
+
+        if snapshot:
+            under_feeder = SnapshotFeeder(under_feeder, timer)
+            deriv_feeders = {strike: SnapshotFeeder(feeder, timer) for strike, feeder in deriv_feeders.items()}
+
+        if isinstance(timer, AdaptiveTimer):
+            strikes = sorted(deriv_feeders)
+            timer.bind(under_feeder, int(strikes[len(strikes)//2]), meta_data["expiration_ts"])
+
+        return deriv_feeders, under_feeder, timer, meta_data
+
+    @classmethod
+    def iterate_ladders(cls,
+                        deriv_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_data/step",
+                        under_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_underlying.csv",
+                        timedelta: int = 60,
+                        timer_factory: Optional[Callable[[], BaseTimer]] = None,
+                        snapshot: bool = False,
+                        min_data_points: int = 3000
+                        ) -> Generator[Tuple[Dict[int, BaseDataFeeder], BaseDataFeeder, BaseTimer, Dict]]:
+        """yields, per date, linked feeders for every contract of the date with enough data,
+        as `link_ladder`. Arguments as `iterate`
+        """
+        loader = LazyLoader(Path(deriv_data_path))
+        under_data = pd.read_csv(under_data_path)
+
+        dates = dict.fromkeys(date for date, _ in loader.contracts())
+        for date in dates:
+            contracts = [(strike, data) for _, strike, data in loader.iterate(date)
+                         if len(data) >= min_data_points]
+            if not contracts:
+                continue
 
-            meta_data = {"strike": strike,
-                         "terminal_u_price": terminal_u_price,
-                         "outcome": outcome,
-                         "date": date,
-                         "data_points": len(data),
-                         "expiration_ts": expiration_ts}
+            d_hist_dicts, u_hist_dict, meta_data = cls.ladder_history(date, contracts, under_data)
 
-            yield deriv_feeder, under_feeder, timer, meta_data
+            yield cls.link_ladder(d_hist_dicts, u_hist_dict, meta_data, timedelta, timer_factory, snapshot)
 
     @classmethod
     def iterate_plots(cls,
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+
+
+@lru_cache(maxsize=None)
+def code_version(root: Path = SRC_ROOT) -> str:
+    """hash of every python source file under `root`, so results computed by different
+    code never share a key
+    """
+    digest = hashlib.sha256()
+    for path in sorted(root.rglob("*.py")):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _file_hash(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_identity(path: Union[str, Path]) -> str:
+    """content hash of a data file. Memoized per (path, size, mtime) within a process"""
+    stat = os.stat(path)
+    return _file_hash(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def qualified_name(obj: Any) -> str:
+    return f"{obj.__module__}.{obj.__qualname__}"
+
+
+class ResultStore:
+    """Append only store of simulation results keyed by a hash of everything that
+    determines them. Results are json lines, written and flushed as they are put, so a
+    run that dies loses nothing it finished and a rerun only does new work.
+
+    A line that was cut off mid-write is ignored when the store is loaded, and ended so
+    results put after it aren't lost with it.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._results[record["key"]] = record
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._file = open(self.path, "a")
+        if self._cut_off():
+            # end the cut off line, so the next result starts a line of its own
+            self._file.write("\n")
+            self.flush()
+
+    def _cut_off(self) -> bool:
+        """whether the file ends in a line without a newline"""
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """sha256 of the canonical json of `parts`"""
+        canonical = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(self._results.items())
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        record = self._results.get(key)
+        return default if record is None else record["value"]
+
+    def record(self, key: str) -> Optional[Dict[str, Any]]:
+        """full record stored under `key`, including the info passed to `put`"""
+        return self._results.get(key)
+
+    def put(self, key: str, value: Any, flush: bool = True, **info: Any) -> None:
+        """stores `value` under `key` along with any descriptive `info`"""
+        record = {"key": key, "value": value, **info}
+        self._results[key] = record
+        self._file.write(json.dumps(record, default=str) + "\n")
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,238 @@
+import itertools
+from math import ceil
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from src.agents import VectorHedgingAgent
+from src.base import BaseAgent, BaseModel
+from src.models.geom_bm import GBMStepModel
+from src.backtester.statistics import RunningStats
+from src.backtester.sweep_runner import SweepRunner, expand_grid
+
+
+class Trial:
+    """a candidate configuration and the running stats of its terminal values"""
+
+    def __init__(self, params: Dict[str, Any], proposed: bool = False):
+        self.params = params
+        self.stats = RunningStats()
+        self.rung = 0
+        self.proposed = proposed
+
+    def score(self, risk_aversion: float) -> float:
+        return self.stats.mean - risk_aversion * self.stats.var
+
+
+class SuccessiveHalving:
+    """Hyperparameter search that evaluates configurations on growing subsets of contracts
+    and drops the worst performers at each step, instead of running every configuration on
+    every contract.
+
+    Rung i runs the surviving configurations on the first `min_contracts * eta**i` contracts
+    (contracts are shuffled once, so subsets are representative), scores them by
+    `mean - risk_aversion * var` of terminal value and keeps the best `1/eta`. Only contracts
+    a configuration has not yet seen are simulated. The final rung runs on every contract.
+
+    If `propose` > 0, after each rung a quadratic surrogate of score over the parameters is fit
+    to the trials so far and the `propose` best predicted points of a random sample of the
+    space join the survivors, evaluated up to the current rung first.
+
+    Args:
+        param_space: name -> list of values (grid axis) or (low, high) tuple (uniform range).
+            Grid axes are expanded as a cartesian product. If any ranges are given, `n_configs`
+            points are sampled instead, taking grid axes uniformly from their values
+        runner_kwargs: passed through to `SweepRunner` (data paths, processes, timedelta, ...)
+    """
+
+    def __init__(self,
+                 param_space: Dict[str, Union[Sequence, Tuple[float, float]]],
+                 agent_factory: Callable[..., BaseAgent] = VectorHedgingAgent,
+                 model: BaseModel = GBMStepModel,
+                 vectorized: bool = True,
+                 eta: int = 3,
+                 min_contracts: int = 8,
+                 risk_aversion: float = 1.0,
+                 n_configs: int = 81,
+                 propose: int = 0,
+                 seed: int = 0,
+                 **runner_kwargs):
+        if eta < 2:
+            raise ValueError("`eta` must be at least 2")
+        if min_contracts < 1:
+            raise ValueError("`min_contracts` must be at least 1")
+
+        self.param_space = param_space
+        self.agent_factory = agent_factory
+        self.model = model
+        self.vectorized = vectorized
+        self.eta = eta
+        self.min_contracts = min_contracts
+        self.risk_aversion = risk_aversion
+        self.n_configs = n_configs
+        self.propose = propose
+        self.runner_kwargs = runner_kwargs
+
+        self._rng = np.random.default_rng(seed)
+        self.trials: List[Trial] = []
+
+        # contract simulations actually run, for comparison against a full grid
+        self.simulations = 0
+
+    def _ranges(self) -> Dict[str, Tuple[float, float]]:
+        ranges = {}
+        for name, axis in self.param_space.items():
+            if isinstance(axis, tuple):
+                ranges[name] = (float(axis[0]), float(axis[1]))
+            else:
+                ranges[name] = (float(np.min(axis)), float(np.max(axis)))
+        return ranges
+
+    def _sample(self, n: int) -> List[Dict[str, Any]]:
+        samples = []
+        for _ in range(n):
+            params = {}
+            for name, axis in self.param_space.items():
+                if isinstance(axis, tuple):
+                    params[name] = float(self._rng.uniform(axis[0], axis[1]))
+                else:
+                    params[name] = axis[self._rng.integers(len(axis))]
+            samples.append(params)
+        return samples
+
+    def initial_configs(self) -> List[Dict[str, Any]]:
+        if any(isinstance(axis, tuple) for axis in self.param_space.values()):
+            return self._sample(self.n_configs)
+        return expand_grid(self.param_space)
+
+    def _runner(self, trials: List[Trial]) -> SweepRunner:
+        return SweepRunner([trial.params for trial in trials],
+                           agent_factory=self.agent_factory,
+                           model=self.model,
+                           vectorized=self.vectorized,
+                           **self.runner_kwargs)
+
+    def _evaluate(self, trials: List[Trial], contracts: List[Tuple[str, int]], rung: int) -> None:
+        """brings every trial's stats up to `contracts`, simulating only what is missing"""
+        # group trials by how far they have been evaluated
+        by_seen: Dict[int, List[Trial]] = {}
+        for trial in trials:
+            by_seen.setdefault(trial.stats.count, []).append(trial)
+
+        for seen, group in by_seen.items():
+            missing = contracts[seen:]
+            if not missing:
+                continue
+
+            runner = self._runner(group)
+            for date, strike, i, value in runner.iter_indexed(missing):
+                group[i].stats.add(value)
+                self.simulations += 1
+
+        for trial in trials:
+            trial.rung = rung
+
+    def _surrogate_proposals(self, n: int) -> List[Dict[str, Any]]:
+        """best `n` points of a random sample under a quadratic fit of score"""
+        ranges = self._ranges()
+        names = list(ranges)
+        lows = np.array([ranges[name][0] for name in names])
+        spans = np.array([ranges[name][1] - ranges[name][0] for name in names])
+        spans[spans == 0] = 1
+
+        def features(x: np.ndarray) -> np.ndarray:
+            # 1, x_i, x_i * x_j (i <= j) on parameters scaled to [0, 1]
+            x = (x - lows) / spans
+            cols = [np.ones(len(x))] + [x[:, i] for i in range(x.shape[1])]
+            cols += [x[:, i] * x[:, j]
+                     for i, j in itertools.combinations_with_replacement(range(x.shape[1]), 2)]
+            return np.column_stack(cols)
+
+        scored = [trial for trial in self.trials if trial.stats.count > 0]
+        x = np.array([[trial.params[name] for name in names] for trial in scored], dtype=float)
+        y = np.array([trial.score(self.risk_aversion) for trial in scored])
+        keep = np.isfinite(y)
+        x, y = x[keep], y[keep]
+
+        design = features(x) if len(x) else None
+        if design is None or len(x) <= design.shape[1]:
+            # not enough points to fit, fall back to random proposals
+            return self._sample(n)
+
+        coef, *_ = np.linalg.lstsq(design, y, rcond=None)
+
+        candidates = self._sample(max(64 * n, 256))
+        cx = np.array([[params[name] for name in names] for params in candidates], dtype=float)
+        predicted = features(cx) @ coef
+
+        return [candidates[i] for i in np.argsort(-predicted)[:n]]
+
+    def run(self, progress: bool = True) -> pd.DataFrame:
+        """runs the search
+
+        Returns:
+            pd.DataFrame: one row per trial with its parameters, mean, var, count (contracts
+                evaluated), score and the rung it reached, best score first
+        """
+        contracts = self._runner([Trial({})]).contracts()
+        if not contracts:
+            raise ValueError("no contracts to search over")
+        order = self._rng.permutation(len(contracts))
+        contracts = [contracts[i] for i in order]
+
+        survivors = [Trial(params) for params in self.initial_configs()]
+        self.trials = list(survivors)
+
+        rung = 0
+        with tqdm(unit="rung", disable=not progress) as bar:
+            while True:
+                budget = min(self.min_contracts * self.eta**rung, len(contracts))
+                if len(survivors) == 1:
+                    # a single survivor goes straight to the full set
+                    budget = len(contracts)
+
+                self._evaluate(survivors, contracts[:budget], rung)
+                best = max(survivors, key=lambda t: t.score(self.risk_aversion))
+                bar.set_postfix(configs=len(survivors), contracts=budget,
+                                best=f"{best.score(self.risk_aversion):.6g}")
+                bar.update()
+
+                if budget == len(contracts):
+                    break
+
+                # keep the best 1/eta
+                survivors.sort(key=lambda t: _sort_key(t.score(self.risk_aversion)))
+                survivors = survivors[:max(ceil(len(survivors) / self.eta), 1)]
+
+                if self.propose > 0:
+                    proposed = [Trial(params, proposed=True)
+                                for params in self._surrogate_proposals(self.propose)]
+                    self._evaluate(proposed, contracts[:budget], rung)
+                    self.trials.extend(proposed)
+                    survivors.extend(proposed)
+
+                rung += 1
+
+        return self.results()
+
+    def results(self) -> pd.DataFrame:
+        rows = []
+        for trial in self.trials:
+            row = dict(trial.params)
+            row["mean"] = trial.stats.mean
+            row["var"] = trial.stats.var
+            row["count"] = trial.stats.count
+            row["score"] = trial.score(self.risk_aversion)
+            row["rung"] = trial.rung
+            row["proposed"] = trial.proposed
+            rows.append(row)
+
+        df = pd.DataFrame(rows)
+        return df.sort_values(["count", "score"], ascending=False).reset_index(drop=True)
+
+
+def _sort_key(score: float) -> float:
+    # best first, nan scores last
+    return -score if np.isfinite(score) else np.inf
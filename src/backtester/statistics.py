@@ -0,0 +1,147 @@
+from bisect import bisect_right
+from math import asin, pi
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class RunningStats:
+    """Count, mean and variance of a stream of values, updated one value at a time
+    (Welford) or by merging with another `RunningStats` (Chan et al.)
+
+    `var` is the population variance, matching `np.var`
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def of(cls, values: Iterable[float]) -> "RunningStats":
+        stats = cls()
+        for value in values:
+            stats.add(value)
+        return stats
+
+    @property
+    def var(self) -> float:
+        if self.count == 0:
+            return float("nan")
+        return self.m2 / self.count
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "RunningStats") -> None:
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> "RunningStats":
+        return cls(data["count"], data["mean"], data["m2"])
+
+
+class QuantileSketch:
+    """Mergeable approximate quantiles of a stream (a merging t-digest). Values are kept as
+    weighted centroids, small near the tails and larger near the median, so memory is
+    bounded by roughly `compression` centroids however many values are added
+    """
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[float] = []
+
+    @property
+    def count(self) -> float:
+        return sum(self._weights) + len(self._buffer)
+
+    def add(self, value: float) -> None:
+        self._buffer.append(value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        other._compress()
+        self._compress(list(zip(other._means, other._weights)))
+
+    def _k(self, q: float) -> float:
+        # scale function, limits centroid size to be small near q = 0 and q = 1
+        return self.compression / (2 * pi) * asin(2 * min(max(q, 0), 1) - 1)
+
+    def _compress(self, extra: Optional[List[Tuple[float, float]]] = None) -> None:
+        points = list(zip(self._means, self._weights))
+        points += [(value, 1.0) for value in self._buffer]
+        if extra:
+            points += extra
+        self._buffer = []
+        if not points:
+            return
+
+        points.sort()
+        total = sum(weight for _, weight in points)
+
+        means = [points[0][0]]
+        weights = [points[0][1]]
+        cumulative = 0.0
+        k_lower = self._k(0)
+        for mean, weight in points[1:]:
+            q = (cumulative + weights[-1] + weight) / total
+            if self._k(q) - k_lower <= 1:
+                # fold into the current centroid
+                weights[-1] += weight
+                means[-1] += (mean - means[-1]) * weight / weights[-1]
+            else:
+                cumulative += weights[-1]
+                k_lower = self._k(cumulative / total)
+                means.append(mean)
+                weights.append(weight)
+
+        self._means = means
+        self._weights = weights
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        if not self._means:
+            return float("nan")
+        if len(self._means) == 1:
+            return self._means[0]
+
+        # centroid i is centered at cumulative weight before it plus half its own
+        total = sum(self._weights)
+        target = q * total
+        cumulative = 0.0
+        centers = []
+        for weight in self._weights:
+            centers.append(cumulative + weight / 2)
+            cumulative += weight
+
+        if target <= centers[0]:
+            return self._means[0]
+        if target >= centers[-1]:
+            return self._means[-1]
+        i = bisect_right(centers, target) - 1
+        frac = (target - centers[i]) / (centers[i + 1] - centers[i])
+        return self._means[i] + frac * (self._means[i + 1] - self._means[i])
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {"compression": self.compression, "means": self._means, "weights": self._weights}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["compression"])
+        sketch._means = list(data["means"])
+        sketch._weights = list(data["weights"])
+        return sketch
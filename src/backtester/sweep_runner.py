@@ -0,0 +1,403 @@
+import itertools
+import multiprocessing as mp
+from math import ceil
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from src.agents import HedgingAgent
+from src.base import BaseAgent, BaseModel, BaseTimer
+from src.data_loaders import LazyLoader, SharedStore
+from src.exceptions import SimFinished
+from src.models import ExposureTrack
+from src.models.geom_bm import GBMStepModel
+from src.backtester.linked_feeders import FeederCreator
+from src.backtester.result_store import ResultStore, code_version, file_identity, qualified_name
+
+
+def hedge_terminal_value(agent: BaseAgent, meta_data: Dict) -> float:
+    """terminal value of a hedging agent's book: hedge P&L plus the contract payout"""
+    return agent.reconcile_hedge(meta_data['terminal_u_price']) + meta_data['outcome']
+
+
+def ladder_terminal_value(agent: BaseAgent, meta_data: Dict) -> float:
+    """terminal value of a ladder hedging agent's book: hedge P&L plus the payouts of the
+    contracts held, with ladder metadata from `FeederCreator.ladder_history`
+    """
+    payouts = np.dot(agent.deriv_position, np.asarray(meta_data['outcomes'], dtype=float))
+    return agent.reconcile_hedge(meta_data['terminal_u_price']) + payouts
+
+
+def run_contract(agent: BaseAgent,
+                 timer: BaseTimer,
+                 meta_data: Dict,
+                 terminal_value: Callable[[BaseAgent, Dict], float] = hedge_terminal_value) -> float:
+    """cycles the timer & has the agent consume new data until the simulation finishes
+
+    Returns:
+        float: `terminal_value` of the agent once finished
+    """
+    while True:
+        timer.cycle()
+        try:
+            agent.consume()
+        except SimFinished:
+            return terminal_value(agent, meta_data)
+
+
+def expand_grid(param_grid: Union[Dict[str, Sequence], Sequence[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """cartesian product of a dict of parameter axes, or a list of parameter dicts as is"""
+    if isinstance(param_grid, dict):
+        names = list(param_grid.keys())
+        return [dict(zip(names, values))
+                for values in itertools.product(*param_grid.values())]
+    return [dict(params) for params in param_grid]
+
+
+def _to_builtin(value: Any) -> Any:
+    # numpy scalars from linspace grids back to python numbers
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _count_rows(path: Path) -> int:
+    # data rows of a csv without parsing it, header excluded
+    with open(path, "rb") as f:
+        return sum(1 for _ in f) - 1
+
+
+# per worker process state, loaded once by `_init_worker`
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(config: Dict) -> None:
+    _worker.clear()
+    _worker["config"] = config
+    if config.get("shared_store") is not None:
+        # views of data loaded once by the parent
+        store = _worker["store"] = SharedStore.attach(config["shared_store"])
+        _worker["loader"] = store
+        _worker["under_columns"] = store.columns("underlying")
+        return
+
+    _worker["loader"] = LazyLoader(Path(config["deriv_data_path"]))
+    _worker["under_data"] = pd.read_csv(config["under_data_path"])
+
+
+def _exposure_track(date: str, strike: int, histories: Tuple[Dict, Dict, Dict]) -> ExposureTrack:
+    """loads the contract's exposure track from the cache directory, building it if missing"""
+    config = _worker["config"]
+    if "paths" not in _worker:
+        _worker["paths"] = LazyLoader(Path(config["deriv_data_path"]))
+
+    key = ResultStore.key(
+        date=date,
+        strike=int(strike),
+        contract=file_identity(_worker["paths"].path(date, strike)),
+        underlying=file_identity(config["under_data_path"]),
+        model=qualified_name(config["model"]),
+        timer={"timedelta": config["timedelta"]},
+        code=code_version())
+    path = Path(config["exposure_cache"]) / f"{key}.npz"
+    if path.exists():
+        return ExposureTrack.load(path)
+
+    deriv_feeder, under_feeder, timer, meta_data = FeederCreator.link(
+        *histories, timedelta=config["timedelta"])
+    deriv_feeder.start()
+    under_feeder.start()
+    probe = HedgingAgent(deriv_feeder, under_feeder, timer, meta_data['strike'], model=config["model"])
+
+    track = ExposureTrack.build(probe, timer)
+    track.save(path)
+    return track
+
+
+def _run_unit(unit: Tuple[str, int, List[int]]) -> Tuple[str, int, List[int], List[float]]:
+    """simulates one contract for a chunk of parameter combinations. The contract is
+    read and converted to feeder histories once, then replayed for every combination
+    """
+    date, strike, param_indices = unit
+    config = _worker["config"]
+
+    if "store" in _worker:
+        # feeders read the shared columns, no per row copy in this process
+        histories = FeederCreator.contract_columns(
+            date, strike, _worker["store"].query_columns(date, strike), _worker["under_columns"])
+    else:
+        data = _worker["loader"].query(date, strike)
+        histories = FeederCreator.contract_history(date, strike, data, _worker["under_data"])
+
+    # exposures are the same for every combination, read from a track if caching
+    shared = {"model": config["model"]}
+    if config["exposure_cache"] is not None:
+        shared["exposure_track"] = _exposure_track(date, strike, histories)
+
+    if config["vectorized"]:
+        # one replay for the whole chunk, parameters passed as arrays
+        deriv_feeder, under_feeder, timer, meta_data = FeederCreator.link(
+            *histories, timedelta=config["timedelta"])
+        deriv_feeder.start()
+        under_feeder.start()
+
+        chunk = [config["params"][i] for i in param_indices]
+        agent = config["agent_factory"](
+            deriv_feeder,
+            under_feeder,
+            timer,
+            meta_data['strike'],
+            **shared,
+            **{name: [params[name] for params in chunk] for name in chunk[0]})
+        values = run_contract(agent, timer, meta_data, config["terminal_value"])
+
+        return date, strike, param_indices, [float(value) for value in values]
+
+    values = []
+    for i in param_indices:
+        deriv_feeder, under_feeder, timer, meta_data = FeederCreator.link(
+            *histories, timedelta=config["timedelta"])
+        deriv_feeder.start()
+        under_feeder.start()
+
+        agent = config["agent_factory"](
+            deriv_feeder,
+            under_feeder,
+            timer,
+            meta_data['strike'],
+            **shared,
+            **config["params"][i])
+        values.append(run_contract(agent, timer, meta_data, config["terminal_value"]))
+
+    return date, strike, param_indices, values
+
+
+class SweepRunner:
+    """Runs an agent over every contract for every point of a parameter grid, sharded
+    across a process pool.
+
+    Work is split into units of (contract, chunk of parameter combinations). Each worker
+    loads the underlying data and maps the contract directory once, and each unit reads its
+    contract once no matter how many combinations it covers. Per contract results stream
+    back as units finish and are aggregated into mean/var per combination.
+
+    Args:
+        param_grid: dict of parameter axes (cartesian product is taken) or list of parameter dicts,
+            passed to `agent_factory` as keyword arguments
+        agent_factory: called as `agent_factory(deriv_feeder, under_feeder, timer, strike, model=model,
+            **params)`. Must be picklable (a class or module level function)
+        model: pricing model handed to the agent
+        processes: worker processes, defaults to the cpu count. 1 runs in process
+        params_per_unit: combinations per work unit. Defaults to as many as possible while still
+            giving each worker several units
+        terminal_value: maps a finished agent and contract metadata to the value aggregated
+        store: if given, results already in the store are not simulated again and new results
+            are written to it as they finish
+        vectorized: `agent_factory` takes each parameter as a sequence over a chunk of combinations
+            and `terminal_value` returns one value per combination (e.g. `VectorHedgingAgent`),
+            so each contract is replayed once per unit instead of once per combination
+        shared_memory: load the underlying & contract data once into a `SharedStore` that workers
+            attach to, instead of every worker reading the files. Feeders replay the shared
+            columns through `ColumnFeeder`, so workers build no per row copy of a contract
+        exposure_cache: directory of per contract `ExposureTrack`s. Exposures are computed once per
+            contract, model & schedule and passed to `agent_factory` as `exposure_track` instead of
+            being recomputed for every combination. Tracks use the default volatility column, so
+            the grid may not vary `estimator` or `sigma_col`
+    """
+
+    def __init__(self,
+                 param_grid: Union[Dict[str, Sequence], Sequence[Dict[str, Any]]],
+                 agent_factory: Callable[..., BaseAgent] = HedgingAgent,
+                 model: BaseModel = GBMStepModel,
+                 deriv_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_data/step",
+                 under_data_path: str = "/Users/morganhawkins/Projects/stale/Kalshi_Stale/data/btc_underlying.csv",
+                 timedelta: int = 60,
+                 min_data_points: int = 3000,
+                 processes: Optional[int] = None,
+                 params_per_unit: Optional[int] = None,
+                 terminal_value: Callable[[BaseAgent, Dict], float] = hedge_terminal_value,
+                 store: Optional[ResultStore] = None,
+                 vectorized: bool = False,
+                 shared_memory: bool = False,
+                 exposure_cache: Optional[str] = None):
+        self.params = [{k: _to_builtin(v) for k, v in params.items()}
+                       for params in expand_grid(param_grid)]
+        if not self.params:
+            raise ValueError("`param_grid` is empty")
+        if exposure_cache is not None and any("estimator" in params or "sigma_col" in params
+                                              for params in self.params):
+            raise ValueError("`exposure_cache` requires the default volatility source")
+
+        self.agent_factory = agent_factory
+        self.model = model
+        self.deriv_data_path = deriv_data_path
+        self.under_data_path = under_data_path
+        self.timedelta = timedelta
+        self.min_data_points = min_data_points
+        self.processes = mp.cpu_count() if processes is None else processes
+        self.params_per_unit = params_per_unit
+        self.terminal_value = terminal_value
+        self.store = store
+        self.vectorized = vectorized
+        self.shared_memory = shared_memory
+        self.exposure_cache = exposure_cache
+        self._loader = None
+
+    def _config(self) -> Dict:
+        return {
+            "deriv_data_path": self.deriv_data_path,
+            "under_data_path": self.under_data_path,
+            "timedelta": self.timedelta,
+            "agent_factory": self.agent_factory,
+            "model": self.model,
+            "params": self.params,
+            "terminal_value": self.terminal_value,
+            "vectorized": self.vectorized,
+            "exposure_cache": self.exposure_cache,
+        }
+
+    def contracts(self, candidates: Optional[List[Tuple[str, int]]] = None) -> List[Tuple[str, int]]:
+        """(date, strike) of every contract with at least `min_data_points` rows, out of
+        `candidates` if given, otherwise out of every contract on disk
+        """
+        loader = LazyLoader(Path(self.deriv_data_path))
+        candidates = loader.contracts() if candidates is None else candidates
+        return [(date, strike) for date, strike in candidates
+                if _count_rows(loader.path(date, strike)) >= self.min_data_points]
+
+    def _units(self, work: List[Tuple[str, int, List[int]]]) -> List[Tuple[str, int, List[int]]]:
+        """splits (date, strike, parameter indices) work into units"""
+        chunk = self.params_per_unit
+        if chunk is None:
+            # aim for at least 4 units per worker so stragglers even out
+            target_units = 4 * self.processes
+            chunks_per_contract = ceil(target_units / max(len(work), 1))
+            widest = max((len(indices) for _, _, indices in work), default=1)
+            chunk = max(ceil(widest / chunks_per_contract), 1)
+
+        return [(date, strike, indices[i:i + chunk])
+                for date, strike, indices in work
+                for i in range(0, len(indices), chunk)]
+
+    def _execute(self, units: List[Tuple[str, int, List[int]]], progress: bool
+                 ) -> Generator[Tuple[str, int, List[int], List[float]]]:
+        config = self._config()
+
+        store = None
+        if self.shared_memory and units:
+            contracts = list(dict.fromkeys((date, strike) for date, strike, _ in units))
+            store = SharedStore.from_paths(self.deriv_data_path, self.under_data_path, contracts)
+            config["shared_store"] = store.name
+
+        if self.processes == 1:
+            _init_worker(config)
+            results = map(_run_unit, units)
+            pool = None
+        else:
+            pool = mp.Pool(self.processes, initializer=_init_worker, initargs=(config,))
+            results = pool.imap_unordered(_run_unit, units)
+
+        try:
+            for result in tqdm(results, total=len(units), disable=not progress):
+                yield result
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if store is not None:
+                _worker.clear()
+                store.unlink()
+
+    def iter_results(self,
+                     contracts: Optional[List[Tuple[str, int]]] = None,
+                     progress: bool = False) -> Generator[Tuple[str, int, Dict[str, Any], float]]:
+        """streams per contract results as they finish
+
+        Yields:
+            Tuple[str, int, Dict[str, Any], float]: date, strike, parameters, terminal value
+        """
+        for date, strike, i, value in self.iter_indexed(contracts, progress):
+            yield date, strike, self.params[i], value
+
+    def iter_indexed(self,
+                     contracts: Optional[List[Tuple[str, int]]] = None,
+                     progress: bool = False) -> Generator[Tuple[str, int, int, float]]:
+        """`iter_results` with the index of the parameter combination in `params` in place
+        of the combination itself
+        """
+        contracts = self.contracts() if contracts is None else contracts
+        param_indices = list(range(len(self.params)))
+
+        if self.store is None:
+            work = [(date, strike, param_indices) for date, strike in contracts]
+            for date, strike, indices, values in self._execute(self._units(work), progress):
+                for i, value in zip(indices, values):
+                    yield date, strike, i, value
+            return
+
+        # serve what the store already has, simulate the rest
+        keys = {}
+        work = []
+        for date, strike in contracts:
+            missing = []
+            for i in param_indices:
+                key = keys[(date, strike, i)] = self.result_key(date, strike, i)
+                if key in self.store:
+                    yield date, strike, i, self.store.get(key)
+                else:
+                    missing.append(i)
+            if missing:
+                work.append((date, strike, missing))
+
+        for date, strike, indices, values in self._execute(self._units(work), progress):
+            for i, value in zip(indices, values):
+                self.store.put(keys[(date, strike, i)], value, flush=False,
+                               date=date, strike=strike, params=self.params[i])
+                yield date, strike, i, value
+            self.store.flush()
+
+    def result_key(self, date: str, strike: int, i: int) -> str:
+        """store key of the result for a contract and parameter combination `i`. Covers the
+        contract's date & strike, contract and underlying file contents, agent, parameters,
+        model, timer, terminal value function and a hash of the source code
+        """
+        if self._loader is None:
+            self._loader = LazyLoader(Path(self.deriv_data_path))
+
+        return ResultStore.key(
+            date=date,
+            strike=int(strike),
+            contract=file_identity(self._loader.path(date, strike)),
+            underlying=file_identity(self.under_data_path),
+            agent=qualified_name(self.agent_factory),
+            params=self.params[i],
+            model=qualified_name(self.model),
+            timer={"timedelta": self.timedelta},
+            terminal_value=qualified_name(self.terminal_value),
+            code=code_version())
+
+    @staticmethod
+    def aggregate(rows: List[Dict[str, Any]], values: List[List[float]]) -> pd.DataFrame:
+        """one row per parameter combination with the mean & var of its terminal values"""
+        results = []
+        for params, end_values in zip(rows, values):
+            row = dict(params)
+            row["mean"] = np.mean(end_values)
+            row["var"] = np.var(end_values)
+            row["count"] = len(end_values)
+            results.append(row)
+
+        return pd.DataFrame(results)
+
+    def run(self, progress: bool = True) -> pd.DataFrame:
+        """runs the full sweep
+
+        Returns:
+            pd.DataFrame: one row per parameter combination with columns for each parameter
+                and the mean, var and count of terminal values across contracts
+        """
+        end_values = [[] for _ in self.params]
+        for date, strike, i, value in self.iter_indexed(None, progress):
+            end_values[i].append(value)
+
+        return self.aggregate(self.params, end_values)
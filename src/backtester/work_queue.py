@@ -0,0 +1,259 @@
+import json
+import os
+import pickle
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from src.backtester.statistics import RunningStats
+from src.backtester.sweep_runner import SweepRunner, _init_worker, _run_unit
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # readers see the old file or the whole new one, never part of it
+    temp_path = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class WorkQueue:
+    """Shards a sweep across processes on any number of machines through a directory on a
+    shared filesystem, with no scheduler or other service.
+
+    `submit` splits a `SweepRunner`'s contracts and parameter grid into units, one file per
+    unit in `pending/`. Workers claim a unit by renaming it into `leased/` (atomic, so exactly
+    one claimant succeeds), touch it as a heartbeat while it runs, write its values to
+    `results/` and move it to `done/`. A lease whose heartbeat is older than `lease_timeout`
+    belonged to a dead worker and is put back in `pending/`. Units run at least once, a
+    unit re-leased from a slow worker may finish twice with the same values, which `reduce`
+    counts once.
+
+    A queue directory holds one sweep. The runner's data paths must be valid on every node,
+    and every node must run the same source code.
+
+    Args:
+        root (Union[str, Path]): queue directory, created if missing
+        lease_timeout (float, optional): seconds without a heartbeat before a lease expires
+    """
+
+    def __init__(self, root: Union[str, Path], lease_timeout: float = 600):
+        self.root = Path(root)
+        self.lease_timeout = lease_timeout
+
+        self.pending = self.root / "pending"
+        self.leased = self.root / "leased"
+        self.done = self.root / "done"
+        self.results = self.root / "results"
+        for directory in (self.pending, self.leased, self.done, self.results):
+            os.makedirs(directory, exist_ok=True)
+
+        self._job_path = self.root / "job.pkl"
+        self._job: Optional[Dict[str, Any]] = None
+
+    def submit(self, runner: SweepRunner, contracts: Optional[List[Tuple[str, int]]] = None) -> int:
+        """writes the work units of a sweep over `contracts` (every contract if not given).
+        Results already in the runner's store are written as finished results instead of units
+
+        Returns:
+            int: number of units queued
+        """
+        if self._job_path.exists():
+            raise ValueError(f"{self.root} already holds a sweep, submit to a new directory")
+
+        contracts = runner.contracts() if contracts is None else contracts
+        param_indices = list(range(len(runner.params)))
+
+        work = []
+        cached = []
+        for date, strike in contracts:
+            missing = []
+            for i in param_indices:
+                key = None if runner.store is None else runner.result_key(date, strike, i)
+                if key is not None and key in runner.store:
+                    cached.append((date, strike, i, runner.store.get(key)))
+                else:
+                    missing.append(i)
+            if missing:
+                work.append((date, strike, missing))
+
+        job = {"config": runner._config(), "params": runner.params}
+        _write_atomic(self._job_path, pickle.dumps(job))
+
+        for n, (date, strike, i, value) in enumerate(cached):
+            self._write_result(f"cached_{n:06d}", date, strike, [i], [value])
+
+        units = runner._units(work)
+        for n, (date, strike, indices) in enumerate(units):
+            unit = {"date": date, "strike": strike, "indices": indices}
+            _write_atomic(self.pending / f"{n:06d}.json", json.dumps(unit).encode())
+
+        return len(units)
+
+    def _load_job(self) -> Dict[str, Any]:
+        if self._job is None:
+            with open(self._job_path, "rb") as f:
+                self._job = pickle.load(f)
+        return self._job
+
+    def _fs_now(self) -> float:
+        # current time by the filesystem's clock, which also stamps heartbeats. Avoids
+        # trusting clocks on different nodes to agree. The file only lives for the read
+        clock = self.root / f".clock.{socket.gethostname()}.{os.getpid()}"
+        clock.touch()
+        try:
+            return clock.stat().st_mtime
+        finally:
+            clock.unlink(missing_ok=True)
+
+    def release_expired(self) -> int:
+        """puts leases with stale heartbeats back in `pending/`
+
+        Returns:
+            int: number of leases released
+        """
+        now = self._fs_now()
+        released = 0
+        for path in self.leased.iterdir():
+            try:
+                if now - path.stat().st_mtime <= self.lease_timeout:
+                    continue
+                os.rename(path, self.pending / path.name)
+                released += 1
+            except FileNotFoundError:
+                # finished or released by someone else meanwhile
+                continue
+        return released
+
+    def claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """leases a pending unit
+
+        Returns:
+            Optional[Tuple[str, Dict[str, Any]]]: unit name & unit, None if nothing is pending
+        """
+        self.release_expired()
+        for name in sorted(os.listdir(self.pending)):
+            try:
+                os.rename(self.pending / name, self.leased / name)
+            except FileNotFoundError:
+                # claimed by another worker first
+                continue
+
+            try:
+                # renaming keeps the old mtime, refresh it before it looks expired
+                os.utime(self.leased / name)
+                with open(self.leased / name, "r") as f:
+                    return name, json.load(f)
+            except FileNotFoundError:
+                # released as expired before the refresh
+                continue
+        return None
+
+    def heartbeat(self, name: str) -> bool:
+        """refreshes the lease on unit `name`
+
+        Returns:
+            bool: False if the lease was lost
+        """
+        try:
+            os.utime(self.leased / name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write_result(self, name: str, date: str, strike: int, indices: List[int], values: List[float]) -> None:
+        result = {"date": date, "strike": strike, "indices": indices, "values": values}
+        _write_atomic(self.results / f"{Path(name).stem}.json", json.dumps(result).encode())
+
+    def complete(self, name: str, date: str, strike: int, indices: List[int], values: List[float]) -> None:
+        """records the values of unit `name` and marks it done"""
+        self._write_result(name, date, strike, indices, values)
+        try:
+            os.rename(self.leased / name, self.done / name)
+        except FileNotFoundError:
+            # the lease expired and the unit was handed out again, the result stands
+            pass
+
+    def _run(self, name: str, unit: Dict[str, Any]) -> List[float]:
+        # runs a unit while a background thread keeps its lease alive
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_timeout / 4):
+                self.heartbeat(name)
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            _, _, _, values = _run_unit((unit["date"], unit["strike"], unit["indices"]))
+        finally:
+            stop.set()
+            thread.join()
+        return [float(value) for value in values]
+
+    def work(self, poll: float = 5.0, wait: bool = True) -> int:
+        """claims & runs units until the queue is drained
+
+        Args:
+            poll (float, optional): seconds between checks while other workers hold leases
+            wait (bool, optional): keep polling while leases are held by other workers, in
+                case they die and their units need running. Otherwise return once nothing
+                is pending
+
+        Returns:
+            int: number of units this worker ran
+        """
+        _init_worker(self._load_job()["config"])
+
+        ran = 0
+        while True:
+            claimed = self.claim()
+            if claimed is None:
+                if not wait or not any(self.leased.iterdir()):
+                    return ran
+                time.sleep(poll)
+                continue
+
+            name, unit = claimed
+            values = self._run(name, unit)
+            self.complete(name, unit["date"], unit["strike"], unit["indices"], values)
+            ran += 1
+
+    def status(self) -> Dict[str, int]:
+        """number of units pending, leased & done"""
+        return {"pending": len(os.listdir(self.pending)),
+                "leased": len(os.listdir(self.leased)),
+                "done": len(os.listdir(self.done))}
+
+    def iter_indexed(self) -> Generator[Tuple[str, int, int, float]]:
+        """every finished result as date, strike, parameter index, terminal value"""
+        for path in sorted(self.results.glob("*.json")):
+            with open(path, "r") as f:
+                result = json.load(f)
+            for i, value in zip(result["indices"], result["values"]):
+                yield result["date"], result["strike"], i, value
+
+    def reduce(self) -> pd.DataFrame:
+        """merges finished results into one row per parameter combination with the mean,
+        var and count of its terminal values, like `SweepRunner.run`
+        """
+        params = self._load_job()["params"]
+        stats = [RunningStats() for _ in params]
+        for _, _, i, value in self.iter_indexed():
+            stats[i].add(value)
+
+        rows = []
+        for combination, combination_stats in zip(params, stats):
+            row = dict(combination)
+            row["mean"] = combination_stats.mean if combination_stats.count else float("nan")
+            row["var"] = combination_stats.var
+            row["count"] = combination_stats.count
+            rows.append(row)
+
+        return pd.DataFrame(rows)
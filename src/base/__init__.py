@@ -4,4 +4,5 @@ from . base_timer import BaseTimer
 from . base_agent import BaseAgent
 from . base_data_loader import BaseDataLoader
 from . base_market import BaseMarket
-from . base_order import BaseOrder
+from . base_order import BaseOrder, Side
+from . base_estimator import BaseEstimator
@@ -7,3 +7,24 @@ class BaseAgent(ABC):
     @abstractmethod
     def consume(self):
         pass
+
+    def supports_blocks(self) -> bool:
+        """whether the agent can `consume_block`, checked before handing it any block"""
+        return False
+
+    def consume_block(self, block: Dict) -> Dict:
+        """consumes a block of N consecutive cycles at once, optional for agents whose
+        decisions only depend on the data and their own state
+
+        Args:
+            block (Dict): "time": timer time & "sim_time": feeder time of each cycle,
+                "deriv" & "under": column -> array of the rows each feeder returns at them
+
+        Returns:
+            Dict: results of every cycle, as arrays
+
+        Raises:
+            NotImplementedError: the agent only consumes one cycle at a time, as
+                `supports_blocks` tells
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not consume blocks")
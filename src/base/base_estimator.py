@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+from numbers import Number
+from typing import Optional
+
+import numpy as np
+
+
+class BaseEstimator(ABC):
+    """Base class for online estimators of underlying volatility. Estimators are fed
+    (time, price) ticks one at a time and must update in O(1) with fixed memory.
+
+    Estimates are in the units the models expect, per hour of log returns.
+
+    Attributes:
+        updates (int): number of returns incorporated into the estimate
+    """
+
+    def __init__(self):
+        self._last_time: Optional[Number] = None
+        self._last_log_price: Optional[float] = None
+        self.updates = 0
+
+    def update(self, time: Number, price: Number) -> None:
+        """Incorporates a new tick. Ticks that do not advance time are ignored, so
+        forward filled data can be passed on every cycle
+
+        Args:
+            time (Number): unix timestamp of the tick in seconds
+            price (Number): underlying price
+        """
+        if self._last_time is not None and time <= self._last_time:
+            return
+
+        log_price = np.log(price)
+        if self._last_time is not None:
+            dt = (time - self._last_time) / 3600
+            self._update(log_price - self._last_log_price, dt)
+            self.updates += 1
+
+        self._last_time = time
+        self._last_log_price = log_price
+
+    @abstractmethod
+    def _update(self, log_return: float, dt: float) -> None:
+        """Incorporates a log return realized over `dt` hours
+        """
+        pass
+
+    @abstractmethod
+    def value(self) -> float:
+        """Current estimate, nan until enough data has been seen
+        """
+        pass
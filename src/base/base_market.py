@@ -1,16 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Literal, Dict, List
+from typing import Literal, Dict, List, Optional
 from numbers import Number
 
 from src.base.base_data_feeder import BaseDataFeeder
 from src.base.base_order import BaseOrder
 from src.exceptions import LiquidityError, IllegalOrderError
+from src.journal import TradeJournal
 
 
 class BaseMarket(ABC):
     """Base class for a market object. A this is meant to represent a market for a specific
     contract (specific date and expiration).
 
+    Prices and cash are kept in integer cents, `cash` and valuations are reported in dollars.
+
     Attributes:
         position (int): number of contracts held
     """
@@ -21,13 +24,15 @@ class BaseMarket(ABC):
                  expiration: float,
                  resolution: Literal[0, 1],
                  allow_short: bool = True,
-                 max_pos: int = None):
+                 max_pos: int = None,
+                 journal: Optional[TradeJournal] = None):
         """_summary_
 
         Args:
             data_feeder (BaseDataFeeder): data_feeder.get must return a dict with "bid" and "ask" as keys
             allow_short (bool): whether allowed to have a negative position
             max_pos (int): the largest absolute position allowed to take
+            journal (Optional[TradeJournal]): records fills, orders & valuations if given
         """
         # storing args passed
         self._data_feeder = data_feeder
@@ -36,10 +41,11 @@ class BaseMarket(ABC):
         self._resolution = resolution
         self._allow_short = allow_short
         self._max_pos = max_pos
+        self._journal = journal
 
         # init to defualt values
         self._position: int = 0
-        self._cash: float = 0
+        self._cash: int = 0  # in cents
         self._orders: List[BaseOrder] = []
 
     @property
@@ -48,6 +54,11 @@ class BaseMarket(ABC):
 
     @property
     def cash(self) -> float:
+        """cash balance in dollars"""
+        return self._cash / 100
+
+    @property
+    def cash_cents(self) -> int:
         return self._cash
 
     @property
@@ -119,7 +130,7 @@ class BaseMarket(ABC):
             ValueError: method is not one of "bid", "ask", "mid", "auto"
 
         Returns:
-            float: value of position
+            float: value of position & cash, in dollars
         """
 
         market = self._data_feeder.get()
@@ -135,9 +146,12 @@ class BaseMarket(ABC):
             raise ValueError(
                 "method must be one of 'bid', 'ask', 'mid', 'auto'")
 
-        print("contract_value:", contract_value)
+        value = contract_value*self.position + self._cash
+        if self._journal is not None:
+            self._journal.valuation(self._data_feeder.time(), self._strike,
+                                    contract_value, self.position, self._cash, value)
 
-        return contract_value*self.position + self._cash
+        return value / 100
 
     def get_data(self) -> Dict:
         data = self._data_feeder.get()
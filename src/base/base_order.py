@@ -1,28 +1,51 @@
 from dataclasses import dataclass
+from enum import IntEnum
 from numbers import Number
-from typing import Literal
+from typing import Literal, Optional, Union
 
 
-@dataclass
+class Side(IntEnum):
+    """order side, valued as the sign of the contracts it adds to a position"""
+    BUY = 1
+    SELL = -1
+
+    @classmethod
+    def of(cls, side: Union["Side", Literal["buy", "sell"]]) -> "Side":
+        """side from a `Side` or its name, "buy" or "sell"
+
+        Raises:
+            ValueError: side is neither
+        """
+        if isinstance(side, cls):
+            return side
+        if side == "buy":
+            return cls.BUY
+        if side == "sell":
+            return cls.SELL
+        raise ValueError(f"side must be one of 'buy', 'sell', got {side!r}")
+
+
+@dataclass(slots=True)
 class BaseOrder():
-    side: Literal["buy", "sell"]
-    price: Number
+    """an order for `count` contracts, prices in integer cents. `side` may be given as
+    "buy" or "sell" and is stored as a `Side`
+    """
+    side: Side
+    price: Optional[int]
     count: int
 
-    def fill_cash_flow(self, price: Number) -> Number:
-        side = -1 if self.side == "buy" else 1
+    def __post_init__(self):
+        self.side = Side.of(self.side)
 
-        return side * price * self.count
+    def fill_cash_flow(self, price: int) -> int:
+        """cash to the account from filling at `price`, in cents"""
+        return -self.side * price * self.count
 
     def fill_contract_flow(self) -> int:
-        side = 1 if self.side == "buy" else -1
-
-        return side * self.count
+        return self.side * self.count
 
     def fill_price(self, price: Number) -> Number:
-        if self.side == "buy":
+        # never worse than the order's limit
+        if self.side is Side.BUY:
             return min(price, self.price)
-        elif self.side == "sell":
-            return max(price, self.price)
-        else:
-            raise Exception("Order.side not in 'buy', 'sell'")
+        return max(price, self.price)
@@ -1,2 +1,6 @@
 from . sim_data_feeder import SimDataFeeder
 from . connected_data_feeder import ConnectedDataFeeder
+from . replay_server import ReplayServer
+from . snapshot_feeder import SnapshotFeeder
+from . depth_feeder import DepthFeeder
+from . column_feeder import ColumnFeeder
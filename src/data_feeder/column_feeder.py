@@ -0,0 +1,75 @@
+from typing import Dict, Optional
+from numbers import Number
+
+import numpy as np
+
+from src.base.base_data_feeder import BaseDataFeeder
+from src.base.base_timer import BaseTimer
+from src.timers import AcceleratedTimer
+from src.exceptions import SimFinished
+
+
+class ColumnFeeder(BaseDataFeeder):
+    """`SimDataFeeder` over columns instead of a list of row dicts, so a history held in
+    arrays, such as `SharedStore` views, is replayed without copying it into python objects.
+
+    `get` finds the last row with "ts" <= simulation time by `searchsorted` and builds the
+    dict of that row only, reusing it while the row doesn't change. As `SimDataFeeder`, it
+    returns None before the first row and raises `SimFinished` once simulation time reaches
+    the last row.
+
+    Args:
+        history_start (Number): history time the simulation starts at
+        history_end (Number): end of the history window
+        columns (Dict[str, np.ndarray]): equal length columns, "ts" sorted
+        timer (Optional[BaseTimer], optional): defaults to an `AcceleratedTimer(1)`
+    """
+
+    def __init__(self,
+                 history_start: Number,
+                 history_end: Number,
+                 columns: Dict[str, np.ndarray],
+                 timer: Optional[BaseTimer] = None):
+        super().__init__()
+        if history_start > history_end:
+            raise ValueError("`history_start` must be less than `history_end`")
+        if "ts" not in columns:
+            raise ValueError("'ts' must be a column")
+        if len(columns["ts"]) == 0:
+            raise ValueError("`columns` are empty")
+        if any(len(column) != len(columns["ts"]) for column in columns.values()):
+            raise ValueError("columns must be of the same length")
+
+        self._history_start = history_start
+        self._history_end = history_end
+        self._columns = columns
+        self._ts = columns["ts"]
+        self._last_ts = self._ts[-1]
+
+        self._timer = AcceleratedTimer(1) if timer is None else timer
+
+        self._sim_start = None
+        self._row = -1
+        self._value = None
+
+    def start(self) -> None:
+        if self._sim_start is not None:
+            raise Exception("Sim already started, cannot start again")
+        self._sim_start = self._timer.time()
+
+    def time(self) -> float:
+        # time change since sim start, added to history start
+        return (self._timer.time() - self._sim_start) + self._history_start
+
+    def get(self) -> Optional[Dict[str, Number]]:
+        """Gets current data point
+        """
+        sim_time = self.time()
+        if sim_time >= self._last_ts:
+            raise SimFinished("Simulation Finished")
+
+        row = int(np.searchsorted(self._ts, sim_time, side="right")) - 1
+        if row != self._row:
+            self._row = row
+            self._value = {name: column[row] for name, column in self._columns.items()}
+        return self._value
@@ -1,18 +1,182 @@
-from typing import Dict, List, Literal, Optional
-from numbers import Number
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Dict, Literal, Optional
 from time import time as timestamp
 
 from src.base.base_data_feeder import BaseDataFeeder
-from src.base.base_timer import BaseTimer
-from src.timers import AcceleratedTimer
 from src.exceptions import SimFinished
 
-# TODO: create wrapper for connector to kalshi api
-
 
 class ConnectedDataFeeder(BaseDataFeeder):
+    """
+    Feeder that consumes a live quote stream. Messages are newline delimited json
+    objects of the form `{"time": float, "value": dict, "sent": float}` read from a
+    tcp connection by an asyncio event loop running in a background thread.
+
+    Received messages are placed in a bounded buffer. When the buffer is full the reader
+    either stops reading from the socket until `get` drains it (`overflow="block"`, which
+    pushes backpressure onto the producer through the tcp window) or discards the oldest
+    message (`overflow="drop"`). `get` never blocks and always returns the latest value.
+
+    Attributes:
+        received (int): number of messages read off of the stream
+        dropped (int): number of messages discarded because the buffer was full
+        last_latency (Optional[float]): seconds between the latest message being
+            received and it being handed out by `get`
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 8765,
+                 buffer_size: int = 1024,
+                 overflow: Literal["block", "drop"] = "block"):
+        super().__init__()
+        if buffer_size < 1:
+            raise ValueError("`buffer_size` must be at least 1")
+        if overflow not in ["block", "drop"]:
+            raise ValueError("`overflow` must be one of 'block', 'drop'")
+
+        self._host = host
+        self._port = port
+        self._buffer_size = buffer_size
+        self._overflow = overflow
+
+        # buffer shared between the event loop thread and the consumer
+        self._buffer = deque()
+        self._lock = threading.Lock()
+
+        # event loop state, created in `start`
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._space: Optional[asyncio.Event] = None
+        self._connected = threading.Event()
+        self._finished = False
+        self._error: Optional[BaseException] = None
+
+        # default init values
+        self._last_time = None
+        self._last_value = None
+        self.received = 0
+        self.dropped = 0
+        self.last_latency = None
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Connects to the stream and begins reading in a background thread
+
+        Args:
+            timeout (float, optional): seconds to wait for the connection. Defaults to 5.0.
+
+        Raises:
+            ConnectionError: if the connection could not be established
+        """
+        if self._thread is not None:
+            raise Exception("Feeder already started, cannot start again")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        if not self._connected.wait(timeout) or self._error is not None:
+            self.stop()
+            raise ConnectionError(
+                f"could not connect to {self._host}:{self._port}") from self._error
+
+    def stop(self) -> None:
+        """Closes the connection and stops the background event loop
+        """
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._finished = True
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._space = asyncio.Event()
+        try:
+            self._loop.run_until_complete(self._read())
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._finished = True
+            self._connected.set()
+            self._loop.close()
+
+    async def _read(self) -> None:
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        self._connected.set()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    # stream closed by the producer
+                    break
+
+                message = json.loads(line)
+                message["recv"] = timestamp()
+                await self._put(message)
+        finally:
+            writer.close()
+
+    async def _put(self, message: Dict) -> None:
+        while True:
+            with self._lock:
+                if len(self._buffer) < self._buffer_size:
+                    self._buffer.append(message)
+                    self.received += 1
+                    return
+
+                if self._overflow == "drop":
+                    self._buffer.popleft()
+                    self._buffer.append(message)
+                    self.received += 1
+                    self.dropped += 1
+                    return
+
+                # buffer full, wait for the consumer to make space
+                self._space.clear()
+
+            await self._space.wait()
+
     def time(self) -> float:
         return timestamp()
 
-    def get(self) -> Dict:
-        pass
+    def data_time(self) -> Optional[float]:
+        """Timestamp attached by the producer to the latest value returned by `get`
+        """
+        return self._last_time
+
+    def get(self) -> Optional[Dict]:
+        """Gets the most recent data point without blocking. Returns None if nothing
+        has been received yet
+
+        Raises:
+            SimFinished: if the stream has closed and every message has been consumed
+        """
+        with self._lock:
+            if self._buffer:
+                message = self._buffer[-1]
+                self._buffer.clear()
+            else:
+                message = None
+
+        if message is not None:
+            if self._overflow == "block" and not self._finished:
+                # wake the reader if it is waiting on space
+                try:
+                    self._loop.call_soon_threadsafe(self._space.set)
+                except RuntimeError:
+                    # loop closed between the check and the call
+                    pass
+
+            self._last_time = message["time"]
+            self._last_value = message["value"]
+            self.last_latency = timestamp() - message["recv"]
+
+        elif self._finished:
+            raise SimFinished("Stream Finished")
+
+        return self._last_value
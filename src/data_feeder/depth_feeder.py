@@ -0,0 +1,104 @@
+from typing import Dict, Optional, Union
+from numbers import Number
+
+import numpy as np
+import pandas as pd
+
+from src.base.base_data_feeder import BaseDataFeeder
+from src.base.base_timer import BaseTimer
+from src.timers import AcceleratedTimer
+from src.exceptions import SimFinished
+from src.data_loaders.depth_loader import SNAPSHOT
+from src.markets.depth_book import DepthBook
+
+
+class DepthFeeder(BaseDataFeeder):
+    """Replays L2 depth history, as loaded by `DepthLoader`, onto a `DepthBook` in
+    simulation time. Time runs as a `SimDataFeeder`'s: from `history_start` once started,
+    at the timer's pace.
+
+    Each `get` applies every update up to the current time in one batch. Only the last
+    snapshot in the batch and the rows after it can matter, so earlier ones are skipped,
+    and the rest go in, in file order, with a single `DepthBook.apply`. A delta among the
+    snapshot rows of a `ts` applies on top of the snapshot rows before it. The book comes
+    out the same however the updates are batched. `get` returns the best bid & ask with
+    the book itself as "depth", which `SimKalshiMarket` walks to fill orders by size.
+
+    Args:
+        history_start (Number): history time the simulation starts at
+        events (Union[pd.DataFrame, Dict[str, np.ndarray]]): columns "ts", "kind", "side",
+            "price", "size" coded as `DepthLoader.query` returns them, sorted by "ts"
+        timer (Optional[BaseTimer], optional): defaults to an `AcceleratedTimer(1)`
+
+    Attributes:
+        book (DepthBook): the replayed book
+    """
+
+    def __init__(self,
+                 history_start: Number,
+                 events: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                 timer: Optional[BaseTimer] = None):
+        super().__init__()
+        self._history_start = history_start
+
+        self._ts = np.asarray(events["ts"], dtype=np.float64)
+        self._kind = np.asarray(events["kind"], dtype=np.int8)
+        self._side = np.asarray(events["side"], dtype=np.int8)
+        self._price = np.asarray(events["price"], dtype=np.int64)
+        self._size = np.asarray(events["size"], dtype=np.int64)
+        if len(self._ts) == 0:
+            raise ValueError("`events` is empty")
+        if np.any(np.diff(self._ts) < 0):
+            raise ValueError("`events` must be sorted by time")
+
+        self._timer = AcceleratedTimer(1) if timer is None else timer
+
+        self.book = DepthBook()
+        self._sim_start = None
+        # index of the first update not applied yet
+        self._next = 0
+        self._value = None
+        self._version = self.book.version
+
+    def start(self) -> None:
+        if self._sim_start is not None:
+            raise Exception("Sim already started, cannot start again")
+        self._sim_start = self._timer.time()
+
+    def time(self) -> float:
+        return self._timer.time() - self._sim_start + self._history_start
+
+    def _apply(self, end: int) -> None:
+        """applies updates [`_next`, `end`) to the book"""
+        start = self._next
+        snapshots = np.flatnonzero(self._kind[start:end] == SNAPSHOT)
+        if len(snapshots):
+            # the batch's last snapshot replaces everything before its first row, the
+            # rows since, deltas among them included, rebuild the book
+            last = start + snapshots[-1]
+            first = start + np.searchsorted(self._ts[start:end], self._ts[last])
+            first += np.argmax(self._kind[first:last + 1] == SNAPSHOT)
+            self.book.reset(self._side[first:end], self._price[first:end], self._size[first:end])
+        elif start < end:
+            self.book.apply(self._side[start:end], self._price[start:end], self._size[start:end])
+        self._next = end
+
+    def get(self) -> Optional[Dict[str, Union[int, DepthBook]]]:
+        """Gets the current quote & depth, None before the first update
+
+        Raises:
+            SimFinished: once simulation time reaches the last update
+        """
+        sim_time = self.time()
+        if sim_time >= self._ts[-1]:
+            raise SimFinished("Simulation Finished")
+
+        end = int(np.searchsorted(self._ts, sim_time, side="right"))
+        if end > self._next:
+            self._apply(end)
+        # fills taking size change the book between updates too
+        if self.book.version != self._version:
+            self._version = self.book.version
+            bid, ask = self.book.quote()
+            self._value = {"bid": bid, "ask": ask, "depth": self.book}
+        return self._value
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+from math import inf
+from numbers import Number
+from typing import Dict, List, Literal, Optional, Tuple, Union
+from time import time as timestamp
+
+from src.data_loaders import LazyLoader
+
+
+class ReplayServer:
+    """
+    Local tcp server that streams historical data in the format read by `ConnectedDataFeeder`.
+    Each connecting client receives the full history, paced so that the gap between
+    messages is the historical gap divided by `speed`.
+
+    Attributes:
+        speed (float): ratio of replay speed to historical speed. `math.inf` streams
+            as fast as the client reads
+        sent (int): number of messages written across all clients
+    """
+
+    def __init__(self,
+                 history_ds: Dict[Literal["time", "value"], List],
+                 speed: float = 1.0,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        if len(history_ds['time']) != len(history_ds['value']):
+            raise ValueError("time and value lists must be of the same length")
+        if speed <= 0:
+            raise ValueError("`speed` must be positive")
+
+        self._history = history_ds
+        self.speed = speed
+        self._host = host
+        self._port = port
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ready = threading.Event()
+        # raised while starting to serve, handed back to `start`
+        self._error: Optional[BaseException] = None
+        self.sent = 0
+
+    @classmethod
+    def from_loader(cls,
+                    loader: LazyLoader,
+                    date: str,
+                    strike: Union[int, str],
+                    speed: float = 1.0,
+                    host: str = "127.0.0.1",
+                    port: int = 0) -> "ReplayServer":
+        """Creates a server replaying the contract history stored by `loader`
+        """
+        data = loader.query(date, strike)
+        history_ds = {"time": data['ts'].tolist(),
+                      "value": data.to_dict("records")}
+
+        return cls(history_ds, speed=speed, host=host, port=port)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """(host, port) the server is bound to. Only valid after `start`
+        """
+        return self._server.sockets[0].getsockname()[:2]
+
+    def start(self, timeout: float = 5.0) -> Tuple[str, int]:
+        """Starts serving in a background thread
+
+        Raises:
+            OSError: the server could not bind, e.g. the port is taken
+            TimeoutError: the server wasn't serving within `timeout` seconds
+
+        Returns:
+            Tuple[str, int]: (host, port) to connect to
+        """
+        if self._thread is not None:
+            raise Exception("Server already started, cannot start again")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        ready = self._ready.wait(timeout)
+        if not ready or self._error is not None:
+            # stopping a loop still starting the server makes `_run` close it
+            self.stop()
+            error = self._error
+            self._loop = self._thread = self._error = None
+            self._ready.clear()
+            if error is not None and ready:
+                raise error
+            raise TimeoutError(f"server not started within {timeout} seconds")
+
+        return self.address
+
+    def stop(self) -> None:
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self._host, self._port))
+        except BaseException as error:
+            self._error = error
+            self._close_loop()
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._close_loop()
+
+    def _close_loop(self) -> None:
+        # cancel clients still being streamed to before closing
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(
+            asyncio.gather(*tasks, return_exceptions=True))
+        self._loop.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        times = self._history['time']
+        values = self._history['value']
+
+        replay_start = self._loop.time()
+        try:
+            for hist_time, value in zip(times, values):
+                if self.speed != inf:
+                    # sleep until this message is due in replay time
+                    due = replay_start + (hist_time - times[0]) / self.speed
+                    delay = due - self._loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                message = {"time": hist_time, "value": value, "sent": timestamp()}
+                writer.write((json.dumps(message, default=_to_builtin) + "\n").encode())
+                self.sent += 1
+
+                # waits if the client is not keeping up
+                await writer.drain()
+        except ConnectionError:
+            # client disconnected
+            pass
+        finally:
+            writer.close()
+
+
+def _to_builtin(obj):
+    # numpy scalars are not json serializable
+    if isinstance(obj, Number):
+        return obj.item() if hasattr(obj, "item") else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,82 @@
+from numbers import Number
+from types import MappingProxyType
+from typing import Any, Hashable, Mapping, Optional
+
+from src.base.base_data_feeder import BaseDataFeeder
+from src.base.base_timer import BaseTimer
+
+
+class SnapshotFeeder(BaseDataFeeder):
+    """
+    Wraps a feeder so it resolves at most once per timer cycle. The first `get` or `time`
+    call in a cycle reads through to the wrapped feeder, and every later call in the same
+    cycle returns the same read-only snapshot. Share one instance between a market and
+    the agents trading it to keep their views consistent.
+
+    Cycles are identified by the timer's time, quantized to `resolution` seconds if given
+    (needed for wall clock timers whose time changes between every call).
+
+    Attributes:
+        resolves (int): number of reads through to the wrapped feeder
+        hits (int): number of calls served from the snapshot
+    """
+
+    def __init__(self,
+                 data_feeder: BaseDataFeeder,
+                 timer: BaseTimer,
+                 resolution: Optional[Number] = None):
+        super().__init__()
+        if resolution is not None and resolution <= 0:
+            raise ValueError("`resolution` must be positive")
+
+        self._data_feeder = data_feeder
+        self._timer = timer
+        self._resolution = resolution
+
+        # cached per cycle
+        self._data_key = None
+        self._time_key = None
+        self._raw = None
+        self._snapshot = None
+        self._time = None
+
+        self.resolves = 0
+        self.hits = 0
+
+    @property
+    def data_feeder(self) -> BaseDataFeeder:
+        return self._data_feeder
+
+    def _key(self) -> Hashable:
+        time = self._timer.time()
+        if self._resolution is None:
+            return time
+        return time // self._resolution
+
+    def start(self) -> None:
+        self._data_feeder.start()
+
+    def time(self) -> float:
+        key = self._key()
+        if key != self._time_key:
+            self._time = self._data_feeder.time()
+            self._time_key = key
+        return self._time
+
+    def get(self) -> Optional[Mapping[str, Any]]:
+        key = self._key()
+        if key == self._data_key:
+            self.hits += 1
+            return self._snapshot
+
+        raw = self._data_feeder.get()
+        self.resolves += 1
+
+        # keep the same snapshot object while the wrapped feeder has no new data,
+        # so consumers can detect changes by identity
+        if raw is not self._raw:
+            self._raw = raw
+            self._snapshot = None if raw is None else MappingProxyType(raw)
+
+        self._data_key = key
+        return self._snapshot
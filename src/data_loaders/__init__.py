@@ -1 +1,4 @@
 from . lazy_loader import LazyLoader
+from . feature_builder import FeatureBuilder
+from . shared_store import SharedStore
+from . depth_loader import DepthLoader
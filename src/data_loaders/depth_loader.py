@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from src.data_loaders.lazy_loader import LazyLoader
+
+# codes of the `kind` column
+SNAPSHOT = 0
+DELTA = 1
+
+KINDS = {"snapshot": SNAPSHOT, "delta": DELTA}
+# bids are resting buys, asks resting sells, coded as their `Side`
+SIDES = {"bid": 1, "ask": -1}
+
+COLUMNS = ("ts", "kind", "side", "price", "size")
+
+
+class DepthLoader(LazyLoader):
+    """Loads L2 order book history laid out as `LazyLoader`'s, `root_dir/date/strike.csv`,
+    one row per level update with columns:
+
+        ts     time of the update, as the quote data's
+        kind   "snapshot" or "delta"
+        side   "bid" or "ask"
+        price  level in cents, 1-99
+        size   resting contracts for a snapshot, change in them for a delta
+
+    The snapshot rows sharing a `ts` make up the whole book at that time, levels absent
+    from it are empty, and delta rows update the book since. Rows are applied in file order
+    within a `ts`, so a delta among the snapshot rows updates the ones before it. `query` returns the rows with `kind` and `side` coded as ints, ready for
+    `DepthFeeder`.
+    """
+
+    def __init__(self, root_dir: Path):
+        super().__init__(Path(root_dir))
+
+    def query(self, date: str, strike: Union[int, str]) -> pd.DataFrame:
+        """Gets depth updates for the specified date and strike, sorted by time
+
+        Raises:
+            ValueError: a column is missing, or a kind, side or price is invalid
+        """
+        data = super().query(date, strike)
+        missing = [column for column in COLUMNS if column not in data.columns]
+        if missing:
+            raise ValueError(f"depth data is missing columns {missing}")
+
+        kind = data["kind"].map(KINDS)
+        side = data["side"].map(SIDES)
+        if kind.isna().any():
+            raise ValueError(f"`kind` must be one of {list(KINDS)}")
+        if side.isna().any():
+            raise ValueError(f"`side` must be one of {list(SIDES)}")
+        if not data["price"].between(1, 99).all():
+            raise ValueError("`price` must be in [1, 99]")
+
+        data = pd.DataFrame({
+            "ts": data["ts"].astype(np.float64),
+            "kind": kind.astype(np.int8),
+            "side": side.astype(np.int8),
+            "price": data["price"].astype(np.int64),
+            "size": data["size"].astype(np.int64),
+        })
+        return data.sort_values("ts", kind="stable", ignore_index=True)
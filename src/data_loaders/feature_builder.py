@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import Optional, Sequence, Union
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureBuilder:
+    """Turns raw underlying ticks into OHLC bars with rolling log return volatilities,
+    producing the `open` and `{horizon}_hour_sigma_log` columns consumed by agents.
+
+    Volatilities are the sample standard deviation of close to close log returns over
+    the trailing `horizon` hours, scaled to hourly units (the units the models expect).
+    Each bar's volatility only uses returns up to the previous bar's close so it is
+    known at the bar's `ts` (its open).
+
+    Attributes:
+        interval (int): bar width in seconds
+        horizons (Sequence[float]): volatility lookback windows in hours
+    """
+
+    def __init__(self,
+                 interval: int = 60,
+                 horizons: Sequence[float] = (4,),
+                 time_col: str = "ts",
+                 price_col: str = "price"):
+        if interval <= 0:
+            raise ValueError("`interval` must be positive")
+        for horizon in horizons:
+            if int(round(horizon * 3600 / interval)) < 2:
+                raise ValueError(
+                    f"horizon of {horizon} hours spans fewer than 2 bars of {interval}s")
+
+        self.interval = interval
+        self.horizons = tuple(horizons)
+        self._time_col = time_col
+        self._price_col = price_col
+
+    @staticmethod
+    def sigma_col(horizon: float) -> str:
+        """Name of the volatility column for `horizon` hours, e.g. '4_hour_sigma_log'
+        """
+        return f"{horizon:g}_hour_sigma_log"
+
+    def bars(self, ticks: pd.DataFrame) -> pd.DataFrame:
+        """Buckets ticks into bars of `interval` seconds. Intervals without ticks
+        are filled flat at the previous close so bar counts map directly to time
+
+        Args:
+            ticks (pd.DataFrame): must contain the time and price columns
+
+        Returns:
+            pd.DataFrame: columns ts (bar start), open, high, low, close, ticks
+        """
+        ticks = ticks.sort_values(self._time_col, kind="stable")
+        times = ticks[self._time_col].to_numpy()
+        prices = ticks[self._price_col].to_numpy(dtype=float)
+        if len(times) == 0:
+            raise ValueError("`ticks` is empty")
+
+        # first tick of each occupied bucket
+        buckets = (times // self.interval).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+
+        # position of each occupied bucket on the full grid
+        grid = buckets[starts] - buckets[0]
+        n_bars = grid[-1] + 1
+
+        close = np.full(n_bars, np.nan)
+        close[grid] = prices[ends]
+        filled = np.zeros(n_bars, dtype=bool)
+        filled[grid] = True
+
+        # forward fill closes through empty buckets
+        last_filled = np.maximum.accumulate(np.where(filled, np.arange(n_bars), 0))
+        close = close[last_filled]
+
+        open_ = close.copy()
+        high = close.copy()
+        low = close.copy()
+        open_[grid] = prices[starts]
+        high[grid] = np.maximum.reduceat(prices, starts)
+        low[grid] = np.minimum.reduceat(prices, starts)
+        counts = np.zeros(n_bars, dtype=np.int64)
+        counts[grid] = ends - starts + 1
+
+        return pd.DataFrame({
+            "ts": (buckets[0] + np.arange(n_bars)) * self.interval,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "ticks": counts,
+        })
+
+    def rolling_sigma_log(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """Adds a volatility column per horizon to `bars` using windowed cumulative sums,
+        so each horizon costs O(n) regardless of its length
+
+        Args:
+            bars (pd.DataFrame): output of `FeatureBuilder.bars`
+
+        Returns:
+            pd.DataFrame: copy of `bars` with the volatility columns added
+        """
+        bars = bars.copy()
+        close = bars["close"].to_numpy(dtype=float)
+
+        # returns[i] is the log return from close i-1 to close i
+        returns = np.diff(np.log(close), prepend=np.nan)
+        # demeaning does not change variance but keeps the cumulative sums small
+        returns[1:] -= returns[1:].mean() if len(returns) > 1 else 0
+
+        valid = ~np.isnan(returns)
+        s1 = np.r_[0, np.cumsum(np.where(valid, returns, 0))]
+        s2 = np.r_[0, np.cumsum(np.where(valid, returns**2, 0))]
+        hourly = np.sqrt(3600 / self.interval)
+
+        for horizon in self.horizons:
+            window = int(round(horizon * 3600 / self.interval))
+            sigma = np.full(len(close), np.nan)
+
+            # sums over returns[i-window+1 : i+1], available once a full window exists
+            hi = np.arange(window + 1, len(close) + 1)
+            lo = hi - window
+            total = s1[hi] - s1[lo]
+            total_sq = s2[hi] - s2[lo]
+            var = (total_sq - total**2 / window) / (window - 1)
+            sigma[window:] = np.sqrt(np.maximum(var, 0)) * hourly
+
+            # shift by one bar so row i only uses returns known at its open
+            bars[self.sigma_col(horizon)] = np.r_[np.nan, sigma[:-1]]
+
+        return bars
+
+    def build(self, ticks: pd.DataFrame) -> pd.DataFrame:
+        """Bars and volatility columns from raw ticks
+        """
+        return self.rolling_sigma_log(self.bars(ticks))
+
+    def load(self, path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None) -> pd.DataFrame:
+        """Builds features from a csv of ticks, reusing a cached result when the
+        source file has not changed since it was built
+
+        Args:
+            path (Union[str, Path]): csv of raw ticks
+            cache_dir (Optional[Union[str, Path]], optional): where to store built features.
+                Defaults to a `.features` directory next to `path`.
+
+        Returns:
+            pd.DataFrame: bars with volatility columns
+        """
+        path = Path(path)
+        cache_dir = path.parent / ".features" if cache_dir is None else Path(cache_dir)
+        horizons = "-".join(f"{h:g}" for h in self.horizons)
+        cache_path = cache_dir / f"{path.stem}_{self.interval}s_{horizons}h.pkl"
+
+        stat = os.stat(path)
+        source = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+        if cache_path.exists():
+            features = pd.read_pickle(cache_path)
+            if features.attrs.get("source") == source:
+                return features
+
+        features = self.build(pd.read_csv(path))
+        features.attrs["source"] = source
+
+        os.makedirs(cache_dir, exist_ok=True)
+        features.to_pickle(cache_path)
+
+        return features
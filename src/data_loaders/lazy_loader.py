@@ -1,6 +1,6 @@
 from pathlib import Path
 from random import choice as random_choice
-from typing import Optional, Generator, Tuple, Union
+from typing import Optional, Generator, List, Tuple, Union
 import os
 
 import pandas as pd
@@ -37,6 +37,17 @@ class LazyLoader(BaseDataLoader):
 
         self._path_data = path_data
 
+    def contracts(self, date: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(date, strike) of every mapped contract, or of those on `date` if specified
+        """
+        dates = self._path_data.keys() if date is None else [date]
+        return [(date_, int(strike)) for date_ in dates for strike in self._path_data[date_]]
+
+    def path(self, date: str, strike: Union[int, str]) -> Path:
+        """Path of the file holding the specified date and strike
+        """
+        return self._path_data[date][str(strike)]
+
     # TODO: add error handling in case file no longer exists
     def query(self, date: str, strike: Union[int, str]) -> pd.DataFrame:
         """Gets data for the specified date and strike
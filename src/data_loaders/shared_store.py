@@ -0,0 +1,176 @@
+import json
+import secrets
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.data_loaders.lazy_loader import LazyLoader
+
+# arrays start on cache line boundaries
+_ALIGN = 64
+
+
+def _contract_key(date: str, strike: Union[int, str]) -> str:
+    return f"contract/{date}/{int(strike)}"
+
+
+class SharedStore:
+    """Market data held once in shared memory for any number of processes. Tables (the
+    underlying series and contract files) are stored column by column in one shared block,
+    described by a small json catalog in a second block. Processes attach by name and get
+    read only numpy views, nothing is copied or pickled.
+
+    Only numeric & boolean columns are stored, other columns are dropped.
+
+    Create with `create` or `from_paths` in one process and `attach` with the store's `name`
+    elsewhere. The creating process owns the memory and frees it with `unlink` (or by using
+    the store as a context manager), attached processes only `close`.
+    """
+
+    def __init__(self,
+                 data: shared_memory.SharedMemory,
+                 catalog: shared_memory.SharedMemory,
+                 owner: bool = False):
+        self._data = data
+        self._catalog = catalog
+        self._owner = owner
+
+        length = int(np.frombuffer(catalog.buf, dtype=np.uint64, count=1)[0])
+        self._tables: Dict[str, Dict[str, List]] = json.loads(bytes(catalog.buf[8:8 + length]))
+
+    @property
+    def name(self) -> str:
+        return self._data.name
+
+    @classmethod
+    def create(cls, tables: Dict[str, pd.DataFrame], name: Optional[str] = None) -> "SharedStore":
+        """copies `tables` into a new shared store
+
+        Args:
+            tables (Dict[str, pd.DataFrame]): tables by key
+            name (Optional[str], optional): name to attach by, random if not given
+        """
+        name = f"kalshi_{secrets.token_hex(6)}" if name is None else name
+
+        # laying out columns
+        catalog = {}
+        size = 0
+        for key, table in tables.items():
+            columns = {}
+            for column in table.columns:
+                values = table[column].to_numpy()
+                if values.dtype.kind not in "biuf":
+                    continue
+                size = -(-size // _ALIGN) * _ALIGN
+                columns[column] = [size, values.dtype.str, len(values)]
+                size += values.nbytes
+            catalog[key] = columns
+
+        encoded = json.dumps(catalog).encode()
+        data = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        catalog_block = shared_memory.SharedMemory(
+            name=f"{name}_catalog", create=True, size=8 + len(encoded))
+        np.frombuffer(catalog_block.buf, dtype=np.uint64, count=1)[0] = len(encoded)
+        catalog_block.buf[8:8 + len(encoded)] = encoded
+
+        # copying data in
+        for key, columns in catalog.items():
+            for column, (offset, dtype, length) in columns.items():
+                view = np.ndarray(length, dtype=np.dtype(dtype), buffer=data.buf, offset=offset)
+                view[:] = tables[key][column].to_numpy()
+                del view
+
+        return cls(data, catalog_block, owner=True)
+
+    @classmethod
+    def from_paths(cls,
+                   deriv_data_path: Union[str, Path],
+                   under_data_path: Union[str, Path],
+                   contracts: Optional[List[Tuple[str, int]]] = None,
+                   name: Optional[str] = None) -> "SharedStore":
+        """shared store of the underlying csv and contract files under `deriv_data_path`
+
+        Args:
+            contracts (Optional[List[Tuple[str, int]]], optional): (date, strike) of the
+                contracts to load, every contract if not given
+        """
+        loader = LazyLoader(Path(deriv_data_path))
+        contracts = loader.contracts() if contracts is None else contracts
+
+        tables = {"underlying": pd.read_csv(under_data_path)}
+        for date, strike in contracts:
+            tables[_contract_key(date, strike)] = loader.query(date, strike)
+
+        return cls.create(tables, name)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedStore":
+        """attaches to a store created by another process"""
+        # not tracked, so this process exiting does not free memory it doesn't own
+        data = shared_memory.SharedMemory(name=name, track=False)
+        catalog = shared_memory.SharedMemory(name=f"{name}_catalog", track=False)
+        return cls(data, catalog)
+
+    def tables(self) -> List[str]:
+        return list(self._tables.keys())
+
+    def columns(self, key: str) -> Dict[str, np.ndarray]:
+        """read only views of the columns of table `key`"""
+        views = {}
+        for column, (offset, dtype, length) in self._tables[key].items():
+            view = np.ndarray(length, dtype=np.dtype(dtype), buffer=self._data.buf, offset=offset)
+            view.flags.writeable = False
+            views[column] = view
+        return views
+
+    def frame(self, key: str) -> pd.DataFrame:
+        """table `key` as a data frame backed by the shared memory"""
+        return pd.DataFrame(self.columns(key), copy=False)
+
+    def underlying(self) -> pd.DataFrame:
+        return self.frame("underlying")
+
+    def contracts(self) -> List[Tuple[str, int]]:
+        """(date, strike) of every stored contract"""
+        contracts = []
+        for key in self._tables:
+            if key.startswith("contract/"):
+                _, date, strike = key.split("/")
+                contracts.append((date, int(strike)))
+        return contracts
+
+    def query(self, date: str, strike: Union[int, str]) -> pd.DataFrame:
+        """contract data, in the form of `LazyLoader.query`"""
+        return self.frame(_contract_key(date, strike))
+
+    def query_columns(self, date: str, strike: Union[int, str]) -> Dict[str, np.ndarray]:
+        """contract data as read only column views"""
+        return self.columns(_contract_key(date, strike))
+
+    def close(self) -> None:
+        """detaches this process. Views still in use keep the memory mapped until they are
+        garbage collected
+        """
+        for block in (self._data, self._catalog):
+            try:
+                block.close()
+            except BufferError:
+                pass
+
+    def unlink(self) -> None:
+        """frees the shared memory, once every process has closed it"""
+        self.close()
+        self._data.unlink()
+        self._catalog.unlink()
+
+    def __enter__(self) -> "SharedStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
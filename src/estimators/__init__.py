@@ -0,0 +1,3 @@
+from . ewma_estimator import EWMAEstimator
+from . windowed_estimator import WindowedEstimator
+from . cauchy_scale_estimator import CauchyScaleEstimator
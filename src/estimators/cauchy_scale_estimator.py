@@ -0,0 +1,55 @@
+from math import pi
+
+import numpy as np
+
+from src.base import BaseEstimator
+
+
+class CauchyScaleEstimator(BaseEstimator):
+    """Estimate of the hourly Cauchy scale of log returns. Under the Cauchy models a
+    return over `dt` hours is Cauchy(dt*loc, dt*scale), so returns are divided by `dt`
+    and the scale is half the interquartile range.
+
+    The quartiles are tracked by stochastic approximation, each nudged towards the
+    observation by a step bounded by the current scale. Unlike order statistic based
+    sketches this stays stable under the extreme observations a Cauchy produces.
+
+    Attributes:
+        window (int): effective number of returns remembered. Steps shrink as 1/n until
+            `window` returns have been seen, then stay fixed so the estimate can drift
+    """
+
+    def __init__(self, window: int = 2000, min_updates: int = 10):
+        super().__init__()
+        if window < 5:
+            raise ValueError("`window` must be at least 5")
+
+        self.window = window
+        self._min_updates = max(min_updates, 5)
+        self._warmup = []
+        self._lower = None
+        self._upper = None
+
+    def _update(self, log_return: float, dt: float) -> None:
+        x = log_return / dt
+
+        if self._lower is None:
+            # seed the quartiles from the first few returns
+            self._warmup.append(x)
+            if len(self._warmup) == 5:
+                seed = sorted(self._warmup)
+                self._lower, self._upper = seed[1], seed[3]
+                self._warmup = None
+            return
+
+        # 1/density of a Cauchy at its quartiles is 2*pi*scale
+        scale = max((self._upper - self._lower) / 2, 1e-12)
+        step = 2 * pi * scale / min(self.updates, self.window)
+
+        self._lower += step * (.25 - (x < self._lower))
+        self._upper += step * (.75 - (x < self._upper))
+
+    def value(self) -> float:
+        if self.updates < self._min_updates or self._lower is None:
+            return np.nan
+        return (self._upper - self._lower) / 2
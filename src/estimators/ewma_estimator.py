@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.base import BaseEstimator
+
+
+class EWMAEstimator(BaseEstimator):
+    """Exponentially weighted estimate of hourly log return volatility. Weights decay
+    with elapsed time rather than tick count, so irregular sampling is handled
+
+    Attributes:
+        halflife (float): hours for a return's weight to halve
+    """
+
+    def __init__(self, halflife: float = 1.0, min_updates: int = 10):
+        super().__init__()
+        if halflife <= 0:
+            raise ValueError("`halflife` must be positive")
+
+        self.halflife = halflife
+        self._min_updates = min_updates
+        self._var = 0.0
+        self._weight = 0.0
+
+    def _update(self, log_return: float, dt: float) -> None:
+        alpha = 1 - np.exp(-np.log(2) * dt / self.halflife)
+
+        # variance per hour of the return, weighted by the time it covers
+        self._var = (1 - alpha) * self._var + alpha * (log_return**2 / dt)
+        # total weight so far, corrects the bias from starting at 0
+        self._weight = (1 - alpha) * self._weight + alpha
+
+    def value(self) -> float:
+        if self.updates < self._min_updates or self._weight == 0:
+            return np.nan
+        return np.sqrt(self._var / self._weight)
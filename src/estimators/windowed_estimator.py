@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.base import BaseEstimator
+
+
+class WindowedEstimator(BaseEstimator):
+    """Sample standard deviation of the last `window` returns, each normalized to
+    hourly units. Maintained with Welford's algorithm over a ring buffer so an
+    update adds the new return and removes the oldest in O(1)
+    """
+
+    def __init__(self, window: int = 240):
+        super().__init__()
+        if window < 2:
+            raise ValueError("`window` must be at least 2")
+
+        self._window = window
+        self._ring = np.zeros(window)
+        self._head = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _update(self, log_return: float, dt: float) -> None:
+        x = log_return / np.sqrt(dt)
+
+        if self._count == self._window:
+            # remove the oldest value before overwriting it
+            old = self._ring[self._head]
+            old_mean = self._mean
+            self._count -= 1
+            self._mean -= (old - old_mean) / self._count
+            self._m2 -= (old - old_mean) * (old - self._mean)
+
+        self._ring[self._head] = x
+        self._head = (self._head + 1) % self._window
+
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def value(self) -> float:
+        if self._count < self._window:
+            return np.nan
+        return np.sqrt(max(self._m2, 0) / (self._count - 1))
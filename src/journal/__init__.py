@@ -0,0 +1,2 @@
+from . column_buffer import ColumnBuffer
+from . trade_journal import TradeJournal, JournalLevel, OrderEvent
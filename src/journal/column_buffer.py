@@ -0,0 +1,135 @@
+import os
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ColumnBuffer:
+    """Growable table of fixed dtype numpy columns. Rows are appended in place and capacity
+    doubles when full, so appends cost a few array stores instead of building python
+    objects, and the table is written out in bulk.
+
+    With `maxlen` the buffer is a fixed size ring instead: it never grows and, once full,
+    each append overwrites the oldest row.
+
+    Args:
+        columns (Sequence[Tuple[str, np.dtype]]): column names & dtypes, in append order
+        capacity (int, optional): initial rows allocated
+        maxlen (Optional[int], optional): keep only the last `maxlen` rows
+    """
+
+    def __init__(self,
+                 columns: Sequence[Tuple[str, np.dtype]],
+                 capacity: int = 1024,
+                 maxlen: Optional[int] = None):
+        if maxlen is not None:
+            capacity = maxlen
+        if capacity < 1:
+            raise ValueError("`capacity` and `maxlen` must be positive")
+
+        self.names = tuple(name for name, _ in columns)
+        self.maxlen = maxlen
+        self._columns = [np.empty(capacity, dtype=dtype) for _, dtype in columns]
+        self._size = 0
+
+        # row the ring writes next, once full it's also the oldest row
+        self._head = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._columns[0])
+
+    def _grow(self) -> None:
+        for i, column in enumerate(self._columns):
+            grown = np.empty(2*len(column), dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[i] = grown
+
+    def append(self, *values) -> None:
+        """appends a row, one value per column in column order"""
+        if self.maxlen is not None:
+            i = self._head
+            self._head = (i + 1) % self.maxlen
+            self._size = min(self._size + 1, self.maxlen)
+        else:
+            if self._size == self.capacity:
+                self._grow()
+            i = self._size
+            self._size += 1
+
+        for column, value in zip(self._columns, values):
+            column[i] = value
+
+    def _ordered(self, column: np.ndarray) -> np.ndarray:
+        # rows oldest first, a view unless the ring has wrapped
+        if self.maxlen is None or self._size < self.maxlen or self._head == 0:
+            return column[:self._size]
+        return np.concatenate([column[self._head:], column[:self._head]])
+
+    def column(self, name: str) -> np.ndarray:
+        """filled part of a column, oldest row first"""
+        return self._ordered(self._columns[self.names.index(name)])
+
+    def last(self, name: str):
+        """most recent value of a column"""
+        if self._size == 0:
+            raise IndexError("buffer is empty")
+        i = (self._head if self.maxlen is not None else self._size) - 1
+        return self._columns[self.names.index(name)][i]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """copies of the filled columns, oldest row first"""
+        return {name: np.array(self._ordered(column)) for name, column in zip(self.names, self._columns)}
+
+    def clear(self) -> None:
+        self._size = 0
+        self._head = 0
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """writes the table to `path` as parquet if pyarrow is installed, otherwise as .npz,
+        atomically replacing any existing file. The suffix of `path` is set accordingly
+
+        Returns:
+            Path: path written
+        """
+        path = Path(path).with_suffix(".npz" if pyarrow is None else ".parquet")
+        os.makedirs(path.parent, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        columns = {name: self._ordered(column) for name, column in zip(self.names, self._columns)}
+        if pyarrow is None:
+            with open(temp_path, "wb") as f:
+                np.savez(f, **columns)
+        else:
+            pyarrow.parquet.write_table(pyarrow.table(columns), temp_path)
+        os.replace(temp_path, path)
+
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ColumnBuffer":
+        """reads a table written by `save`"""
+        path = Path(path)
+        if path.suffix == ".parquet":
+            table = pyarrow.parquet.read_table(path)
+            columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        else:
+            with np.load(path) as data:
+                columns = {name: data[name] for name in data.files}
+
+        size = len(next(iter(columns.values()))) if columns else 0
+        buffer = cls([(name, column.dtype) for name, column in columns.items()], max(size, 1))
+        for i, column in enumerate(columns.values()):
+            buffer._columns[i][:size] = column
+        buffer._size = size
+        return buffer
@@ -0,0 +1,148 @@
+from enum import IntEnum
+from pathlib import Path
+from typing import Dict, Optional, Union
+from numbers import Number
+
+import numpy as np
+
+from src.journal.column_buffer import ColumnBuffer
+
+
+class JournalLevel(IntEnum):
+    """what a `TradeJournal` records, each level including the ones below it"""
+    SILENT = 0
+    FILLS = 1
+    ORDERS = 2
+    VALUATIONS = 3
+    # also prints every record as it's made
+    VERBOSE = 4
+
+
+class OrderEvent(IntEnum):
+    PLACED = 0
+    CANCELLED = 1
+
+
+SIDE_NAMES = {1: "buy", -1: "sell", 0: "both sides"}
+
+
+class TradeJournal:
+    """Record of a simulation's fills, order events & position valuations, kept in growable
+    columnar buffers and written out in bulk, instead of printed line by line.
+
+    Recording methods return right away below their level, so a journal at `SILENT` costs
+    one comparison per call. Markets take an optional journal, without one nothing is
+    recorded.
+
+    Tables, prices & cash in cents and sides as `Side` values, 1 for buy, -1 for sell and 0
+    for both:
+        fills: time, strike, side, price, count, position & cash after the fill
+        orders: time, strike, event, side, price (nan for market orders), count (orders
+            cancelled, for cancels)
+        valuations: time, strike, contract price, position, cash, value
+
+    Args:
+        level (JournalLevel, optional): what to record
+        capacity (int, optional): initial rows allocated per table
+    """
+
+    def __init__(self, level: JournalLevel = JournalLevel.FILLS, capacity: int = 1024):
+        self.level = JournalLevel(level)
+        self.fills = ColumnBuffer([("time", np.float64),
+                                   ("strike", np.int64),
+                                   ("side", np.int8),
+                                   ("price", np.int64),
+                                   ("count", np.int64),
+                                   ("position", np.int64),
+                                   ("cash", np.int64)], capacity)
+        self.orders = ColumnBuffer([("time", np.float64),
+                                    ("strike", np.int64),
+                                    ("event", np.int8),
+                                    ("side", np.int8),
+                                    ("price", np.float64),
+                                    ("count", np.int64)], capacity)
+        self.valuations = ColumnBuffer([("time", np.float64),
+                                        ("strike", np.int64),
+                                        ("price", np.float64),
+                                        ("position", np.int64),
+                                        ("cash", np.int64),
+                                        ("value", np.float64)], capacity)
+
+        # number of flushes so far, each writes a new part per table
+        self._parts = 0
+
+    @property
+    def tables(self) -> Dict[str, ColumnBuffer]:
+        return {"fills": self.fills, "orders": self.orders, "valuations": self.valuations}
+
+    def fill(self,
+             time: float,
+             strike: int,
+             side: int,
+             price: int,
+             count: int,
+             position: int,
+             cash: int) -> None:
+        if self.level < JournalLevel.FILLS:
+            return
+        self.fills.append(time, strike, side, price, count, position, cash)
+        if self.level >= JournalLevel.VERBOSE:
+            print(f"filled {SIDE_NAMES[side]} {count} of {strike} at {price} (time: {time}) "
+                  f"position: {position} cash: {cash}")
+
+    def order(self,
+              time: float,
+              strike: int,
+              event: OrderEvent,
+              side: Optional[int],
+              price: Optional[Number],
+              count: int) -> None:
+        if self.level < JournalLevel.ORDERS:
+            return
+        side = 0 if side is None else side
+        self.orders.append(time, strike, event, side, np.nan if price is None else price, count)
+        if self.level >= JournalLevel.VERBOSE:
+            print(f"{event.name.lower()} {SIDE_NAMES[side]} {count} of {strike} at {price} (time: {time})")
+
+    def valuation(self,
+                  time: float,
+                  strike: int,
+                  price: Number,
+                  position: int,
+                  cash: int,
+                  value: float) -> None:
+        if self.level < JournalLevel.VALUATIONS:
+            return
+        self.valuations.append(time, strike, price, position, cash, value)
+        if self.level >= JournalLevel.VERBOSE:
+            print(f"valued {position} of {strike} at {price} (time: {time}) value: {value}")
+
+    def flush(self, directory: Union[str, Path]) -> Dict[str, Path]:
+        """writes every table to `directory` as a new part, `{table}-{part}`, in parquet if
+        pyarrow is installed otherwise .npz, and empties the buffers
+
+        Returns:
+            Dict[str, Path]: table name -> path written
+        """
+        paths = {}
+        for name, table in self.tables.items():
+            paths[name] = table.save(Path(directory) / f"{name}-{self._parts:05d}")
+            table.clear()
+        self._parts += 1
+        return paths
+
+    @staticmethod
+    def read(directory: Union[str, Path]) -> Dict[str, Dict[str, np.ndarray]]:
+        """every part flushed to `directory`, concatenated per table
+
+        Returns:
+            Dict[str, Dict[str, np.ndarray]]: table name -> column name -> values
+        """
+        tables = {}
+        for name in ("fills", "orders", "valuations"):
+            parts = [ColumnBuffer.load(path).to_dict()
+                     for path in sorted(Path(directory).glob(f"{name}-*"))]
+            if parts:
+                tables[name] = {column: np.concatenate([part[column] for part in parts])
+                                for column in parts[0]}
+        return tables
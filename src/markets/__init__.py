@@ -1 +1,5 @@
 from . sim_kalshi_market import SimKalshiMarket
+from . order_book import OrderBook
+from . portfolio_exchange import PortfolioExchange
+from . order_pool import OrderPool, OrderStatus
+from . depth_book import DepthBook
@@ -0,0 +1,108 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.base import Side
+from src.markets.order_book import MIN_PRICE, MAX_PRICE, PAYOUT
+
+
+class DepthBook:
+    """Resting size at every cent level of a contract's order book, as two numpy arrays
+    indexed by price: `bids` (resting buys) and `asks` (resting sells). Levels 1-99 are
+    used, index 0 is always empty.
+
+    Snapshots and deltas from L2 data are applied as whole arrays, and orders walk the book
+    with a cumulative sum over the levels they can reach rather than a python loop over
+    levels. Size taken by fills is removed from the book, so it stays taken until data puts
+    it back.
+
+    Attributes:
+        version (int): incremented by every change, two equal versions mean the same book
+    """
+
+    def __init__(self):
+        # both sides in one array, so updates to either index it flat
+        self._sizes = np.zeros((2, MAX_PRICE + 1), dtype=np.int64)
+        self.bids = self._sizes[0]
+        self.asks = self._sizes[1]
+        self.version = 0
+
+    def _levels(self, side: int) -> np.ndarray:
+        # resting orders a `side` order fills against
+        return self.asks if side == Side.BUY else self.bids
+
+    @property
+    def best_bid(self) -> int:
+        """highest level with bids, 0 if none"""
+        levels = np.flatnonzero(self.bids)
+        return int(levels[-1]) if len(levels) else MIN_PRICE - 1
+
+    @property
+    def best_ask(self) -> int:
+        """lowest level with asks, 100 if none"""
+        levels = np.flatnonzero(self.asks)
+        return int(levels[0]) if len(levels) else PAYOUT
+
+    def quote(self) -> Tuple[int, int]:
+        """(best bid, best ask)"""
+        return self.best_bid, self.best_ask
+
+    def apply(self, side: np.ndarray, price: np.ndarray, size: np.ndarray) -> None:
+        """adds `size` to the level of each (side, price) in order, 1 for bids and -1 for
+        asks. A level is floored at 0 after every update, as deltas may remove size already
+        taken by fills, so the book doesn't depend on how updates are batched
+        """
+        if len(size) == 0:
+            return
+        flat = self._sizes.reshape(-1)
+        index = np.where(side == Side.BUY, 0, MAX_PRICE + 1) + price
+
+        # updates grouped by level, in order within each
+        order = np.argsort(index, kind="stable")
+        index, size = index[order], size[order]
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        levels = index[starts]
+        group = np.cumsum(np.r_[False, index[1:] != index[:-1]])
+
+        # running size of each level after every update, were it never floored
+        running = np.cumsum(size)
+        running -= (running - size)[starts][group]
+        running += flat[levels][group]
+
+        # flooring after each update lifts the final size by the deepest dip below 0
+        low = np.minimum.reduceat(running, starts)
+        flat[levels] = running[np.r_[starts[1:], len(running)] - 1] - np.minimum(low, 0)
+        self.version += 1
+
+    def reset(self, side: np.ndarray, price: np.ndarray, size: np.ndarray) -> None:
+        """replaces the whole book with a snapshot, and any updates following it in order"""
+        self._sizes[:] = 0
+        self.version += 1
+        self.apply(side, price, size)
+
+    def walk(self, side: int, count: int, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """fills up to `count` contracts of a `side` order against the book, best level first
+        and no further than `limit` (any level if None), removing the size taken
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: price & size filled at each level reached, best first
+        """
+        levels = self._levels(side)
+        if side == Side.BUY:
+            last = MAX_PRICE if limit is None else min(limit, MAX_PRICE)
+            prices = np.arange(MIN_PRICE, last + 1)
+        else:
+            last = MIN_PRICE if limit is None else max(limit, MIN_PRICE)
+            prices = np.arange(MAX_PRICE, last - 1, -1)
+
+        sizes = levels[prices]
+        # size left to fill when reaching each level, bounded by the level's size
+        before = np.cumsum(sizes) - sizes
+        taken = np.clip(count - before, 0, sizes)
+
+        filled = taken > 0
+        prices, taken = prices[filled], taken[filled]
+        if len(prices):
+            levels[prices] -= taken
+            self.version += 1
+        return prices, taken
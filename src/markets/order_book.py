@@ -0,0 +1,256 @@
+from collections import deque
+from numbers import Number
+from typing import List, Literal, Optional, Tuple, Union
+
+from src.base import BaseOrder, Side
+from src.orders import MarketOrder
+from src.exceptions import IllegalOrderError
+from src.markets.order_pool import OrderPool, OrderStatus
+
+# limit orders rest on kalshi's 1-99 cent grid
+MIN_PRICE = 1
+MAX_PRICE = 99
+
+# cents a contract pays if it resolves to 1
+PAYOUT = 100
+
+
+def price_level(price: Number) -> int:
+    """integer price level of a limit order price
+
+    Raises:
+        IllegalOrderError: price is not a whole number of cents in [1, 99]
+    """
+    try:
+        level = int(price)
+    except (TypeError, ValueError):
+        raise IllegalOrderError(f"limit price must be a number of cents, got {price!r}")
+    if level != price or not MIN_PRICE <= level <= MAX_PRICE:
+        raise IllegalOrderError(
+            f"limit price must be a whole number of cents in [{MIN_PRICE}, {MAX_PRICE}], got {price!r}")
+    return level
+
+
+def cents(price: Number) -> int:
+    """a quoted price as integer cents"""
+    return int(round(price))
+
+
+class OrderBook:
+    """Open orders of one market, limit orders indexed by price level with a FIFO queue per
+    level and pointers to the best (highest) buy and best (lowest) sell level. Market
+    orders wait in their own FIFO queue per side and take any quote within the 0-100 cent
+    payout range.
+
+    Orders live in an `OrderPool`, which several books may share, and the queues only hold
+    their slots. Matching only visits levels that cross the quote and cancelling a side or
+    a level doesn't look at other orders. The pool numbers arrivals so the book can still
+    list & fill orders in the order they were placed. Cancelled orders are released to the
+    pool, filled ones are left for the caller to settle & release.
+
+    Args:
+        pool (Optional[OrderPool], optional): pool holding the orders, a new one if None
+    """
+
+    def __init__(self, pool: Optional[OrderPool] = None):
+        self.pool = OrderPool() if pool is None else pool
+
+        # keyed by `Side`, which also finds the pool's int side codes
+        self._levels = {side: [deque() for _ in range(MAX_PRICE + 1)] for side in Side}
+        self._market = {side: deque() for side in Side}
+
+        # best resting levels, past the edge of the grid when a side is empty
+        self._best_buy = MIN_PRICE - 1
+        self._best_sell = MAX_PRICE + 1
+
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def best_buy(self) -> int:
+        """highest level with a resting buy, 0 if none"""
+        return self._best_buy
+
+    @property
+    def best_sell(self) -> int:
+        """lowest level with a resting sell, 100 if none"""
+        return self._best_sell
+
+    def add(self, slot: int) -> None:
+        """puts a pending order of the pool on the book. Its limit price must be on the grid"""
+        pool = self.pool
+        pool.open(slot)
+        self._size += 1
+
+        side = pool.side[slot]
+        if pool.market[slot]:
+            self._market[side].append(slot)
+            return
+
+        level = pool.price[slot]
+        self._levels[side][level].append(slot)
+        if side == Side.BUY:
+            self._best_buy = max(self._best_buy, level)
+        else:
+            self._best_sell = min(self._best_sell, level)
+
+    def add_order(self, order: BaseOrder) -> int:
+        """puts an order object on the book
+
+        Raises:
+            IllegalOrderError: a limit order's price is off the grid
+
+        Returns:
+            int: slot of the order
+        """
+        price = None if isinstance(order, MarketOrder) else price_level(order.price)
+        slot = self.pool.allocate(order.side, order.count, price)
+        self.add(slot)
+        return slot
+
+    def slots(self) -> List[int]:
+        """slots of every open order, in order of arrival"""
+        slots = [slot for queue in self._market.values() for slot in queue]
+        slots += [slot for levels in self._levels.values() for level in levels for slot in level]
+        arrival = self.pool.arrival
+        return sorted(slots, key=lambda slot: arrival[slot])
+
+    def orders(self) -> List[BaseOrder]:
+        """every open order as an order object, in order of arrival"""
+        return [self.pool.order(slot) for slot in self.slots()]
+
+    def _refresh_best(self, side: Side) -> None:
+        levels = self._levels[side]
+        if side is Side.BUY:
+            while self._best_buy >= MIN_PRICE and not levels[self._best_buy]:
+                self._best_buy -= 1
+        else:
+            while self._best_sell <= MAX_PRICE and not levels[self._best_sell]:
+                self._best_sell += 1
+
+    def match(self, bid: Number, ask: Number) -> List[Tuple[int, Number]]:
+        """removes every order the quote fills: buys priced at or above `ask` and sells at
+        or below `bid`, market orders included. Filled orders stay in the pool until released
+
+        Returns:
+            List[Tuple[int, Number]]: slots of filled orders & their fill price, in order of arrival
+        """
+        fills = []
+
+        market_buys = self._market[Side.BUY]
+        if market_buys and ask <= PAYOUT:
+            fills += [(slot, ask) for slot in market_buys]
+            market_buys.clear()
+        market_sells = self._market[Side.SELL]
+        if market_sells and bid >= 0:
+            fills += [(slot, bid) for slot in market_sells]
+            market_sells.clear()
+
+        buys = self._levels[Side.BUY]
+        while self._best_buy >= MIN_PRICE and self._best_buy >= ask:
+            fills += [(slot, ask) for slot in buys[self._best_buy]]
+            buys[self._best_buy].clear()
+            self._refresh_best(Side.BUY)
+
+        sells = self._levels[Side.SELL]
+        while self._best_sell <= MAX_PRICE and self._best_sell <= bid:
+            fills += [(slot, bid) for slot in sells[self._best_sell]]
+            sells[self._best_sell].clear()
+            self._refresh_best(Side.SELL)
+
+        self._size -= len(fills)
+        if len(fills) > 1:
+            arrival = self.pool.arrival
+            fills.sort(key=lambda fill: arrival[fill[0]])
+        return fills
+
+    def requeue(self, slots: List[int]) -> None:
+        """puts matched orders that only partly filled back on the book ahead of their
+        level's queue, keeping their arrival numbers. `slots` must be in order of arrival
+        """
+        pool = self.pool
+        for slot in reversed(slots):
+            self._size += 1
+            side = pool.side[slot]
+            if pool.market[slot]:
+                self._market[side].appendleft(slot)
+                continue
+
+            level = pool.price[slot]
+            self._levels[side][level].appendleft(slot)
+            if side == Side.BUY:
+                self._best_buy = max(self._best_buy, level)
+            else:
+                self._best_sell = min(self._best_sell, level)
+
+    def _cancel(self, queue: deque) -> None:
+        for slot in queue:
+            self.pool.release(slot, OrderStatus.CANCELLED)
+        self._size -= len(queue)
+        queue.clear()
+
+    def cancel_level(self, side: Union[Side, Literal["buy", "sell"]], price: Number) -> None:
+        """cancels the limit orders of `side` resting at `price`"""
+        side = Side.of(side)
+        try:
+            level = price_level(price)
+        except IllegalOrderError:
+            # off the grid, nothing can rest there
+            return
+
+        self._cancel(self._levels[side][level])
+        self._refresh_best(side)
+
+    def cancel_side(self, side: Union[Side, Literal["buy", "sell"]]) -> None:
+        """cancels every limit order of `side`"""
+        side = Side.of(side)
+        levels = self._levels[side]
+        if side is Side.BUY:
+            for level in range(MIN_PRICE, self._best_buy + 1):
+                self._cancel(levels[level])
+            self._best_buy = MIN_PRICE - 1
+        else:
+            for level in range(self._best_sell, MAX_PRICE + 1):
+                self._cancel(levels[level])
+            self._best_sell = MAX_PRICE + 1
+
+    def cancel_limits(self) -> None:
+        """cancels every limit order"""
+        self.cancel_side(Side.BUY)
+        self.cancel_side(Side.SELL)
+
+    def cancel_market(self) -> None:
+        """cancels every waiting market order"""
+        for queue in self._market.values():
+            self._cancel(queue)
+
+    def cancel(self, slot: int) -> bool:
+        """cancels one open order
+
+        Returns:
+            bool: whether the order was on the book
+        """
+        pool = self.pool
+        if pool.status[slot] != OrderStatus.OPEN:
+            return False
+        side = pool.side[slot]
+        if pool.market[slot]:
+            queue = self._market[side]
+        else:
+            queue = self._levels[side][pool.price[slot]]
+        try:
+            queue.remove(slot)
+        except ValueError:
+            return False
+
+        pool.release(slot, OrderStatus.CANCELLED)
+        self._size -= 1
+        if not pool.market[slot]:
+            self._refresh_best(Side(side))
+        return True
+
+    def clear(self) -> None:
+        self.cancel_limits()
+        self.cancel_market()
@@ -0,0 +1,155 @@
+from array import array
+from collections import deque
+from enum import IntEnum
+from typing import Literal, Optional, Union
+
+from src.base import BaseOrder, Side
+from src.orders import LimitOrder, MarketOrder
+
+# handles pack a slot's generation above its index
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class OrderStatus(IntEnum):
+    FREE = 0
+    # placed, still on its way to the book
+    PENDING = 1
+    OPEN = 2
+    FILLED = 3
+    CANCELLED = 4
+
+
+class OrderPool:
+    """Orders of a market as a struct of arrays: side, limit price, market flag, count,
+    status and arrival number per slot. Closed orders' slots are reused, oldest first, so
+    a market placing & cancelling orders every cycle allocates no objects once the pool
+    has grown to its working size.
+
+    Columns are typed `array.array`s, compact like numpy arrays but without numpy's cost
+    per scalar read or write, which is how the market touches them.
+
+    Callers get an int handle per order, the slot plus a generation that changes every time
+    the slot is reused, so a handle outliving its order is detected rather than pointing at
+    another order. `order` builds a `LimitOrder` / `MarketOrder` from a slot on demand.
+
+    Args:
+        capacity (int, optional): initial slots, doubled when all are in use
+    """
+
+    def __init__(self, capacity: int = 256):
+        if capacity < 1:
+            raise ValueError("`capacity` must be positive")
+
+        self.side = array("b", bytes(capacity))
+        self.price = array("h", bytes(2*capacity))  # limit price in cents
+        self.market = array("b", bytes(capacity))
+        self.count = array("q", bytes(8*capacity))
+        self.status = array("b", bytes(capacity))
+        self.arrival = array("q", bytes(8*capacity))
+        self.generation = array("q", bytes(8*capacity))
+
+        self._free = deque(range(capacity))
+        self._arrivals = 0
+
+    def __len__(self) -> int:
+        """slots in use"""
+        return self.capacity - len(self._free)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.status)
+
+    def _grow(self) -> None:
+        capacity = self.capacity
+        for column in (self.side, self.price, self.market, self.count, self.status, self.arrival,
+                       self.generation):
+            column.frombytes(bytes(column.itemsize * capacity))
+        self._free.extend(range(capacity, 2*capacity))
+
+    def allocate(self,
+                 side: Union[Side, Literal["buy", "sell"]],
+                 count: int,
+                 price: Optional[int] = None) -> int:
+        """takes a slot for a pending order, a market order if `price` is None
+
+        Returns:
+            int: slot of the order
+        """
+        side = Side.of(side)
+        if not self._free:
+            self._grow()
+        slot = self._free.popleft()
+
+        self.side[slot] = side
+        self.set_price(slot, price)
+        self.count[slot] = count
+        self.status[slot] = OrderStatus.PENDING
+        return slot
+
+    def allocate_order(self, order: BaseOrder) -> int:
+        return self.allocate(order.side, order.count, None if isinstance(order, MarketOrder) else order.price)
+
+    def open(self, slot: int) -> int:
+        """marks an order as on the book, numbering its arrival
+
+        Returns:
+            int: arrival number, increasing in order of arrival
+        """
+        self.status[slot] = OrderStatus.OPEN
+        arrival = self.arrival[slot] = self._arrivals
+        self._arrivals += 1
+        return arrival
+
+    def set_price(self, slot: int, price: Optional[int]) -> None:
+        """sets a pending order's limit price, None for a market order"""
+        self.market[slot] = price is None
+        self.price[slot] = 0 if price is None else price
+
+    def release(self, slot: int, status: OrderStatus) -> None:
+        """closes an order as filled or cancelled, its slot goes back to the pool. The status
+        stays readable until the slot is reused
+        """
+        self.status[slot] = status
+        self.generation[slot] += 1
+        self._free.append(slot)
+
+    def handle(self, slot: int) -> int:
+        """handle of the order in `slot`"""
+        return (self.generation[slot] << SLOT_BITS) | slot
+
+    def slot(self, handle: int) -> int:
+        """slot of an open or pending order
+
+        Raises:
+            KeyError: the order is closed
+        """
+        slot = handle & SLOT_MASK
+        if slot >= self.capacity or self.generation[slot] != handle >> SLOT_BITS:
+            raise KeyError(f"order {handle} is closed")
+        return slot
+
+    def order_status(self, handle: int) -> OrderStatus:
+        """status of an order, from its handle
+
+        Raises:
+            KeyError: the order has closed and its slot was reused since
+        """
+        slot = handle & SLOT_MASK
+        generation = handle >> SLOT_BITS
+        if slot < self.capacity:
+            if self.generation[slot] == generation:
+                return OrderStatus(self.status[slot])
+            if self.generation[slot] == generation + 1 and self.status[slot] in (OrderStatus.FILLED,
+                                                                               OrderStatus.CANCELLED):
+                # released, not reused yet
+                return OrderStatus(self.status[slot])
+        raise KeyError(f"order {handle} is no longer tracked")
+
+    def order(self, slot: int) -> BaseOrder:
+        """the order in `slot` as an order object"""
+        side = Side(self.side[slot])
+        count = self.count[slot]
+        if self.market[slot]:
+            return MarketOrder(count=count, side=side)
+        return LimitOrder(side=side, price=self.price[slot], count=count)
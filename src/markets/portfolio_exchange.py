@@ -0,0 +1,358 @@
+import heapq
+from dataclasses import dataclass
+from itertools import count
+from typing import Dict, Hashable, List, Literal, Optional, Tuple
+from numbers import Number
+
+from src.base import BaseDataFeeder, BaseTimer, BaseOrder, Side
+from src.exceptions import SimFinished, ExpiredMarketError
+from src.markets.order_book import OrderBook, PAYOUT, cents, price_level
+from src.markets.order_pool import OrderPool, OrderStatus
+from src.journal import TradeJournal, OrderEvent
+
+
+@dataclass
+class _Listing:
+    """one contract listed on the exchange"""
+    data_feeder: BaseDataFeeder
+    strike: int
+    expiration: float
+    resolution: Literal[0, 1]
+    book: OrderBook
+    position: int = 0
+    cash: int = 0  # in cents
+    last_quote: Optional[Tuple[Number, Number]] = None
+    arrived: bool = False
+    finished: bool = False
+
+
+class PortfolioExchange:
+    """Simulates the markets of many contracts under one timer and one cash account, so a
+    strategy trading a whole strike ladder cycles one object instead of a `SimKalshiMarket`
+    per contract.
+
+    Each cycle advances the timer once and runs one fill pass over the books that have open
+    orders, reading quotes only for those contracts (and skipping those whose quote hasn't
+    changed since their last pass with nothing new arrived). Expirations sit on a heap keyed
+    by timer time, so resolving costs nothing until a contract actually expires. Fills and
+    resolutions follow `SimKalshiMarket`: buys at or above the ask fill at the ask, sells at
+    or below the bid fill at the bid, and an expiring contract pays its position into cash
+    if it resolves to 1. Expired contracts are delisted and their open orders dropped.
+    Cash is kept in integer cents and reported in dollars.
+
+    Feeders must all run on the exchange's timer. Contracts are identified by any hashable
+    key, their strike by default. Every book keeps its orders in one shared `OrderPool`, and
+    orders are identified by the handle returned when placing them.
+
+    Args:
+        timer (BaseTimer): timer every listed contract's feeder runs on
+        journal (Optional[TradeJournal], optional): records fills, orders & valuations
+
+    Attributes:
+        fill_passes (int): number of books matched against a quote
+        resolved (Dict[Hashable, int]): key -> position held at expiration, of delisted contracts
+    """
+
+    def __init__(self, timer: BaseTimer, journal: Optional[TradeJournal] = None):
+        self._timer = timer
+        self._journal = journal
+        self._listings: Dict[Hashable, _Listing] = {}
+        self._pool = OrderPool()
+
+        # account wide balance, in cents
+        self._cash: int = 0
+
+        # contracts with open orders, as an insertion ordered set
+        self._open: Dict[Hashable, None] = {}
+
+        # pending expirations, as (timer time, sequence, key)
+        self._expiries: List[Tuple[float, int, Hashable]] = []
+        self._sequence = count()
+        self._started = False
+
+        self.fill_passes = 0
+        self.resolved: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._listings
+
+    @property
+    def timer(self) -> BaseTimer:
+        return self._timer
+
+    @property
+    def cash(self) -> float:
+        """cash balance in dollars"""
+        return self._cash / 100
+
+    @property
+    def cash_cents(self) -> int:
+        return self._cash
+
+    @property
+    def keys(self) -> List[Hashable]:
+        """keys of listed (unexpired) contracts"""
+        return list(self._listings)
+
+    @property
+    def positions(self) -> Dict[Hashable, int]:
+        """key -> position of every listed contract with a nonzero position"""
+        return {key: listing.position for key, listing in self._listings.items() if listing.position != 0}
+
+    def _listing(self, key: Hashable) -> _Listing:
+        try:
+            return self._listings[key]
+        except KeyError:
+            if key in self.resolved:
+                raise ExpiredMarketError(f"contract {key!r} has expired")
+            raise KeyError(f"no contract listed as {key!r}")
+
+    def list_market(self,
+                    data_feeder: BaseDataFeeder,
+                    strike: int,
+                    expiration: float,
+                    resolution: Literal[0, 1],
+                    key: Optional[Hashable] = None) -> Hashable:
+        """lists a contract, started right away if the exchange already is
+
+        Args:
+            data_feeder (BaseDataFeeder): contract quotes on the exchange's timer, `get` must
+                return a dict with "bid" and "ask" as keys
+            key (Optional[Hashable], optional): contract identifier, defaults to `strike`
+
+        Returns:
+            Hashable: key of the contract
+        """
+        key = strike if key is None else key
+        if key in self._listings or key in self.resolved:
+            raise ValueError(f"a contract is already listed as {key!r}")
+
+        self._listings[key] = _Listing(data_feeder, strike, expiration, resolution, OrderBook(self._pool))
+        if self._started:
+            self._start(key)
+        return key
+
+    def _start(self, key: Hashable) -> None:
+        listing = self._listings[key]
+        listing.data_feeder.start()
+
+        # feeder time runs at a fixed offset from timer time, so expiration maps to the
+        # timer time the contract expires at
+        offset = listing.data_feeder.time() - self._timer.time()
+        heapq.heappush(self._expiries, (listing.expiration - offset, next(self._sequence), key))
+
+    def start(self) -> None:
+        for key in self._listings:
+            self._start(key)
+        self._started = True
+
+    def time(self) -> float:
+        return self._timer.time()
+
+    def tte(self, key: Hashable) -> float:
+        listing = self._listing(key)
+        return listing.expiration - listing.data_feeder.time()
+
+    def position(self, key: Hashable) -> int:
+        return self._listing(key).position
+
+    def market_cash(self, key: Hashable) -> float:
+        """cash flow from trading one contract in dollars, resolution included while it's listed"""
+        return self._listing(key).cash / 100
+
+    def get_data(self, key: Hashable) -> Dict:
+        return self._listing(key).data_feeder.get()
+
+    def _fill_order(self, listing: _Listing, slot: int, price: Number) -> None:
+        pool = self._pool
+        side = pool.side[slot]
+        count = pool.count[slot]
+
+        price = cents(price)
+        cash_delta = -side * price * count
+        listing.cash += cash_delta
+        self._cash += cash_delta
+        listing.position += side * count
+
+        if self._journal is not None:
+            fill_price = price
+            if not pool.market[slot]:
+                limit = pool.price[slot]
+                fill_price = min(price, limit) if side == Side.BUY else max(price, limit)
+            self._journal.fill(listing.data_feeder.time(), listing.strike, side, fill_price,
+                               count, listing.position, self._cash)
+
+        pool.release(slot, OrderStatus.FILLED)
+
+    def _fill_all(self) -> None:
+        for key in list(self._open):
+            listing = self._listings[key]
+            try:
+                market = listing.data_feeder.get()
+            except SimFinished:
+                # no more quotes, the contract's orders can't fill anymore
+                listing.finished = True
+                del self._open[key]
+                continue
+            if market is None:
+                # no quote yet
+                continue
+
+            # as in `SimKalshiMarket`, only a moved quote or new orders can produce fills
+            quote = (market['bid'], market['ask'])
+            if not listing.arrived and quote == listing.last_quote:
+                continue
+            listing.last_quote = quote
+            listing.arrived = False
+            self.fill_passes += 1
+
+            for slot, price in listing.book.match(*quote):
+                self._fill_order(listing, slot, price)
+            if not len(listing.book):
+                del self._open[key]
+
+    def _resolve(self) -> None:
+        """resolves and delists every contract whose expiration has passed"""
+        while self._expiries:
+            _, _, key = self._expiries[0]
+            listing = self._listings[key]
+            if listing.expiration - listing.data_feeder.time() > 0:
+                break
+            heapq.heappop(self._expiries)
+
+            if listing.resolution == 1:
+                listing.cash += PAYOUT * listing.position
+                self._cash += PAYOUT * listing.position
+
+            self.resolved[key] = listing.position
+            listing.book.clear()
+            self._open.pop(key, None)
+            del self._listings[key]
+
+    def cycle(self) -> None:
+        self._timer.cycle()
+        self._fill_all()
+        self._resolve()
+
+    def _add(self, key: Hashable, side: Side, contracts: int, price: Optional[int]) -> int:
+        listing = self._listing(key)
+        slot = self._pool.allocate(side, contracts, price)
+        handle = self._pool.handle(slot)
+        if listing.finished:
+            # would never fill, as when a `SimKalshiMarket`'s feed runs out
+            self._pool.release(slot, OrderStatus.CANCELLED)
+            return handle
+
+        listing.book.add(slot)
+        listing.arrived = True
+        self._open[key] = None
+
+        if self._journal is not None:
+            self._journal.order(listing.data_feeder.time(), listing.strike, OrderEvent.PLACED,
+                                int(side), price, contracts)
+        return handle
+
+    def market_order(self, key: Hashable, contracts: int, side: Literal["buy", "sell"]) -> int:
+        """
+        Returns:
+            int: handle of the order
+        """
+        return self._add(key, Side.of(side), contracts, None)
+
+    def limit_order(self, key: Hashable, contracts: int, side: Literal["buy", "sell"], price: Number) -> int:
+        """
+        Raises:
+            IllegalOrderError: the order would rest at a price off the 1-99 cent grid
+
+        Returns:
+            int: handle of the order
+        """
+        side = Side.of(side)
+        market = self.get_data(key)
+        if (side is Side.BUY) and (price >= market['ask']):
+            return self._add(key, side, contracts, None)
+        elif (side is Side.SELL) and (price <= market['bid']):
+            return self._add(key, side, contracts, None)
+        else:
+            return self._add(key, side, contracts, price_level(price))
+
+    def order_status(self, handle: int) -> OrderStatus:
+        """status of an order, raises KeyError once it's no longer tracked"""
+        return self._pool.order_status(handle)
+
+    def order(self, handle: int) -> BaseOrder:
+        """an open order, raises KeyError if it's closed"""
+        return self._pool.order(self._pool.slot(handle))
+
+    def cancel_order(self, key: Hashable, handle: int) -> bool:
+        """cancels one of a contract's orders
+
+        Returns:
+            bool: whether the order was open on that contract's book
+        """
+        book = self._listing(key).book
+        try:
+            slot = self._pool.slot(handle)
+        except KeyError:
+            return False
+        return book.cancel(slot)
+
+    def liquidate(self, key: Optional[Hashable] = None) -> None:
+        """liquidates the position in one contract, or in every contract if `key` is None"""
+        keys = self.positions if key is None else [key]
+        for key in keys:
+            contracts = -self.position(key)
+            side = Side.BUY if contracts > 0 else Side.SELL
+            if contracts != 0:
+                self.market_order(key, abs(contracts), side)
+
+    def clear_orders(self, key: Optional[Hashable] = None) -> None:
+        """removes the limit orders of one contract, or of every contract if `key` is None"""
+        keys = list(self._open) if key is None else [key]
+        for key in keys:
+            self._listing(key).book.cancel_limits()
+
+    def remove_orders(self, key: Hashable, side=None, price=None) -> None:
+        # removes market orders, and limit orders on `side` or at `price`, as `SimKalshiMarket`
+        book = self._listing(key).book
+        book.cancel_market()
+        if side is not None:
+            book.cancel_side(side)
+        if price is not None:
+            book.cancel_level(Side.BUY, price)
+            book.cancel_level(Side.SELL, price)
+
+    def portfolio_value(self, method: Literal["bid", "ask", "mid", "auto"] = "auto") -> float:
+        """cash plus every listed position valued at its current quote, as
+        `BaseMarket.position_value`, in dollars
+
+        Raises:
+            ValueError: method is not one of "bid", "ask", "mid", "auto"
+        """
+        if method not in ("bid", "ask", "mid", "auto"):
+            raise ValueError("method must be one of 'bid', 'ask', 'mid', 'auto'")
+
+        value = self._cash
+        for listing in self._listings.values():
+            if listing.position == 0:
+                continue
+            market = listing.data_feeder.get()
+            side = method
+            if side == "auto":
+                side = "bid" if listing.position > 0 else "ask"
+
+            if side == "mid":
+                contract_value = (market["bid"] + market["ask"])/2
+            else:
+                contract_value = market[side]
+            value += contract_value*listing.position
+
+            if self._journal is not None:
+                self._journal.valuation(listing.data_feeder.time(), listing.strike, contract_value,
+                                        listing.position, listing.cash,
+                                        contract_value*listing.position + listing.cash)
+
+        return value / 100
@@ -1,9 +1,18 @@
-from typing import Literal, Dict
+import heapq
+import math
+from itertools import count
+from typing import Callable, Literal, Dict, List, Optional, Tuple, Union
 from numbers import Number
 
-from src.base import BaseMarket, BaseTimer, BaseDataFeeder, BaseOrder
-from src.orders import LimitOrder, MarketOrder
-from src.exceptions import SimFinished
+from src.base import BaseMarket, BaseTimer, BaseDataFeeder, BaseOrder, Side
+from src.exceptions import SimFinished, IllegalOrderError
+from src.markets.depth_book import DepthBook
+from src.markets.order_book import OrderBook, MAX_PRICE, MIN_PRICE, PAYOUT, cents, price_level
+from src.markets.order_pool import OrderPool, OrderStatus
+from src.journal import TradeJournal, OrderEvent
+
+# seconds, or a function drawing seconds from a distribution
+Latency = Union[Number, Callable[[], Number]]
 
 
 class SimKalshiMarket(BaseMarket):
@@ -14,52 +23,178 @@ class SimKalshiMarket(BaseMarket):
                  expiration: float,
                  resolution: Literal[0, 1],
                  allow_short: bool = True,
-                 max_pos: int = None):
-        super().__init__(data_feeder, strike, expiration, resolution, allow_short, max_pos)
+                 max_pos: int = None,
+                 order_latency: Latency = 0,
+                 cancel_latency: Latency = 0,
+                 journal: Optional[TradeJournal] = None):
+        """
+        Args:
+            data_feeder (BaseDataFeeder): contract quotes, dicts with "bid" and "ask". If they
+                also carry a `DepthBook` as "depth", orders fill against its resting size
+                and may fill partly
+            order_latency (Latency, optional): delay before a placed order reaches the book,
+                in seconds of simulation time. A number, or a function sampled per order
+            cancel_latency (Latency, optional): delay before a cancel takes effect, likewise.
+                Cancels also reach orders still pending, so one overtaking its order voids it
+            journal (Optional[TradeJournal], optional): records fills, orders & valuations
+        """
+        # orders are pool slots, callers get handles
+        self._pool = OrderPool()
+        self._book = OrderBook(self._pool)
+        super().__init__(data_feeder, strike, expiration, resolution, allow_short, max_pos, journal)
 
         self._timer = timer
 
-    def _fill_order(self, order: BaseOrder, price: Number) -> None:
-        # calc changes in cash and contracts
-        cash_delta = order.fill_cash_flow(price)
-        fill_price = order.fill_price(price)
-        contract_delta = order.fill_contract_flow()
+        # delayed order arrivals & cancels, as (due time, sequence, action)
+        self.order_latency = order_latency
+        self.cancel_latency = cancel_latency
+        self._events: List[Tuple[float, int, Callable[[], None]]] = []
+        self._sequence = count()
+        # slots of orders placed but not yet arrived, with their limit price (None for
+        # market orders), so cancels taking effect first can still reach them
+        self._pending: Dict[int, Optional[Number]] = {}
+
+        # a fill pass is only needed after orders arrive or the quote changes
+        self._last_quote: Optional[Tuple[Number, Number]] = None
+        self._arrived = True
+        self.fill_passes = 0
+
+    @property
+    def _orders(self) -> List[BaseOrder]:
+        """open orders in order of arrival"""
+        return self._book.orders()
+
+    @_orders.setter
+    def _orders(self, orders: List[BaseOrder]) -> None:
+        self._book.clear()
+        for order in orders:
+            self._add(self._book.add_order(order), on_book=True)
+
+    def _add(self, slot: int, on_book: bool = False) -> None:
+        if not on_book:
+            self._book.add(slot)
+        self._arrived = True
+        if self._journal is not None:
+            pool = self._pool
+            self._journal.order(self._data_feeder.time(), self._strike, OrderEvent.PLACED,
+                                pool.side[slot], None if pool.market[slot] else pool.price[slot],
+                                pool.count[slot])
+
+    def _cancel(self, cancel: Callable[[], None], side=None, price=None) -> None:
+        before = len(self._book) + len(self._pending)
+        cancel()
+        if self._journal is not None:
+            self._journal.order(self._data_feeder.time(), self._strike, OrderEvent.CANCELLED,
+                                side, price, before - len(self._book) - len(self._pending))
+
+    def _cancel_pending(self, match: Callable[[int, Optional[Number]], bool]) -> None:
+        # cancels orders still on their way to the book, their arrival is then skipped
+        for slot, price in list(self._pending.items()):
+            if match(slot, price):
+                del self._pending[slot]
+                self._pool.release(slot, OrderStatus.CANCELLED)
+
+    def _schedule(self, latency: Latency, action: Callable[[], None]) -> None:
+        """runs `action` now or, if `latency` is positive, once simulation time passes it"""
+        delay = latency() if callable(latency) else latency
+        if delay <= 0:
+            action()
+            return
+        due = self._data_feeder.time() + delay
+        heapq.heappush(self._events, (due, next(self._sequence), action))
+
+    def _process_events(self) -> None:
+        now = self._data_feeder.time()
+        while self._events and self._events[0][0] <= now:
+            _, _, action = heapq.heappop(self._events)
+            action()
 
-        print(
-            f"filled at (tte:{self.tte/3600}) (price: ${fill_price}) ", order)
+    @property
+    def pending_events(self) -> int:
+        """orders & cancels placed but not yet in effect"""
+        return len(self._events)
+
+    def next_event_time(self) -> Optional[float]:
+        """simulation time the next pending order or cancel takes effect, None if none"""
+        return self._events[0][0] if self._events else None
+
+    def _fill_order(self, slot: int, price: Number) -> None:
+        self._settle(slot, price, self._pool.count[slot])
+        self._pool.release(slot, OrderStatus.FILLED)
+
+    def _settle(self, slot: int, price: Number, count: int) -> None:
+        """books `count` contracts of an order filled at `price`"""
+        pool = self._pool
+        side = pool.side[slot]
+
+        # calc changes in cash and contracts in cents, as `BaseOrder`'s fill methods
+        price = cents(price)
+        cash_delta = -side * price * count
+        contract_delta = side * count
 
         # apply changes
         self._cash += cash_delta
         self._position += contract_delta
 
+        if self._journal is not None:
+            fill_price = price
+            if not pool.market[slot]:
+                limit = pool.price[slot]
+                fill_price = min(price, limit) if side == Side.BUY else max(price, limit)
+            self._journal.fill(self._data_feeder.time(), self._strike, side, fill_price,
+                               count, self._position, self._cash)
+
+    def _fill_depth(self, depth: DepthBook, bid: Number, ask: Number) -> None:
+        """fills crossing orders against the quote's depth, walking the book level by level.
+        Orders the depth can't fill in full keep their place on the book with what's left
+        """
+        pool = self._pool
+        unfilled = []
+        for slot, _ in self._book.match(bid, ask):
+            count = pool.count[slot]
+            limit = None if pool.market[slot] else pool.price[slot]
+            prices, sizes = depth.walk(pool.side[slot], count, limit)
+            for price, size in zip(prices.tolist(), sizes.tolist()):
+                self._settle(slot, price, size)
+
+            remaining = count - int(sizes.sum())
+            if remaining > 0:
+                pool.count[slot] = remaining
+                unfilled.append(slot)
+            else:
+                pool.release(slot, OrderStatus.FILLED)
+        self._book.requeue(unfilled)
+
     def _fill_all(self) -> None:
         # getting current data
         market = self.get_data()
         bid = market['bid']
         ask = market['ask']
+        depth = market.get('depth')
 
-        # orders not filled to be left as open
-        orders_left = []
-
-        # iterate through orders
-        for order in self._orders:
-            if (order.side == "buy") and (order.price >= ask):
-                self._fill_order(order, ask)
-
-            elif (order.side == "sell") and (order.price <= bid):
-                self._fill_order(order, bid)
+        # every order crossing the last quote was filled, so unless the quote (or the depth
+        # behind it) moved or orders arrived since, nothing can match
+        quote = (bid, ask) if depth is None else (bid, ask, depth.version)
+        if not self._arrived and quote == self._last_quote:
+            return
+        self._last_quote = quote
+        self._arrived = False
+        self.fill_passes += 1
 
-            else:
-                orders_left.append(order)
+        if depth is not None:
+            self._fill_depth(depth, bid, ask)
+            return
 
-        self._orders = orders_left
+        # only levels crossing the quote are visited, fills come back in order of arrival
+        for slot, price in self._book.match(bid, ask):
+            self._fill_order(slot, price)
 
     def _resolve(self) -> None:
         """Resolve contracts if tte <=0
         """
         if self.tte <= 0:
             if self._resolution == 1:
-                self._cash += self._position
+                self._cash += PAYOUT * self._position
 
             self._position = 0
             # print("contract resolved, cash bal:", self._cash)
@@ -70,37 +205,133 @@ class SimKalshiMarket(BaseMarket):
     def cycle(self) -> None:
         try:
             self._timer.cycle()
+            self._process_events()
             self._fill_all()
         except SimFinished:
             # print("feed finished")
             pass
         self._resolve()
 
-    def market_order(self, contracts: int, side: Literal["buy", "sell"]) -> None:
-        self._orders.append(MarketOrder(count=contracts, side=side))
+    def _place(self, slot: int, price: Optional[Number]) -> int:
+        """sends a pending order to the book, a limit order at `price` unless it's None"""
+        handle = self._pool.handle(slot)
+        self._pending[slot] = price
+        self._schedule(self.order_latency, lambda: self._arrive(handle))
+        return handle
 
-    def limit_order(self, contracts: int, side: Literal["buy", "sell"], price: Number) -> None:
-        market = self.get_data()
-        if (side == "buy") and (price >= market['ask']):
-            self._orders.append(MarketOrder(count=contracts, side="buy"))
-        elif (side == "sell") and (price <= market['bid']):
-            self._orders.append(MarketOrder(count=contracts, side="sell"))
+    def _arrive(self, handle: int) -> None:
+        try:
+            slot = self._pool.slot(handle)
+        except KeyError:
+            # cancelled on the way, the slot may already hold another order
+            return
+        price = self._pending.pop(slot)
+        if price is None:
+            self._add(slot)
         else:
-            self._orders.append(LimitOrder(
-                count=contracts, side=side, price=price))
+            self._arrive_limit(slot, price)
+
+    def market_order(self, contracts: int, side: Literal["buy", "sell"]) -> int:
+        """
+        Returns:
+            int: handle of the order
+        """
+        return self._place(self._pool.allocate(side, contracts), None)
+
+    def _arrive_limit(self, slot: int, price: Number) -> None:
+        # marketability is judged against the quote when the order reaches the book,
+        # marketable orders stay market orders. Walking depth, they keep their limit
+        market = self.get_data()
+        side = self._pool.side[slot]
+        marketable = (((side == Side.BUY) and (price >= market['ask'])) or
+                      ((side == Side.SELL) and (price <= market['bid'])))
+        if not marketable:
+            try:
+                # resting orders must be on the cent grid
+                self._pool.set_price(slot, price_level(price))
+            except IllegalOrderError:
+                self._pool.release(slot, OrderStatus.CANCELLED)
+                raise
+        elif market.get('depth') is not None:
+            # a marketable limit needn't be on the grid, the walk stops at the last level within it
+            if side == Side.BUY:
+                limit = min(math.floor(price), MAX_PRICE)
+            else:
+                limit = max(math.ceil(price), MIN_PRICE)
+            self._pool.set_price(slot, limit)
+        self._add(slot)
+
+    def limit_order(self, contracts: int, side: Literal["buy", "sell"], price: Number) -> int:
+        """
+        Raises:
+            IllegalOrderError: the order would rest at a price off the 1-99 cent grid. With
+                order latency, any price off the grid
+
+        Returns:
+            int: handle of the order
+        """
+        if self.order_latency != 0:
+            # rejected up front, the order could come to rest when it arrives
+            price_level(price)
+        return self._place(self._pool.allocate(side, contracts), price)
+
+    def order_status(self, handle: int) -> OrderStatus:
+        """status of an order placed by this market, raises KeyError once it's no longer tracked"""
+        return self._pool.order_status(handle)
+
+    def order(self, handle: int) -> BaseOrder:
+        """a pending or open order, raises KeyError if it's closed"""
+        return self._pool.order(self._pool.slot(handle))
+
+    def cancel_order(self, handle: int) -> None:
+        """cancels one order if it's still pending or open when the cancel takes effect. A
+        cancel overtaking its order, with less latency, cancels it before it arrives
+        """
+        def cancel():
+            try:
+                slot = self._pool.slot(handle)
+            except KeyError:
+                return
+            if slot in self._pending:
+                del self._pending[slot]
+                self._pool.release(slot, OrderStatus.CANCELLED)
+            else:
+                self._book.cancel(slot)
+
+        self._schedule(self.cancel_latency, lambda: self._cancel(cancel))
 
     def liquidate(self) -> None:
         contracts = -self._position
-        side = "buy" if self.position < 0 else "sell"
+        side = Side.BUY if contracts > 0 else Side.SELL
 
         if contracts != 0:
-            self._orders.append(MarketOrder(count=contracts, side=side))
+            self.market_order(abs(contracts), side)
 
     def clear_orders(self) -> None:
-        self._orders = [
-            order for order in self._orders if isinstance(order, MarketOrder)]
+        """cancels every limit order, open or still pending, when the cancel takes effect"""
+        def cancel():
+            self._cancel_pending(lambda _, limit: limit is not None)
+            self._book.cancel_limits()
+
+        self._schedule(self.cancel_latency, lambda: self._cancel(cancel))
+
+    def _remove_orders(self, side=None, price=None) -> None:
+        # removes market orders, and limit orders on `side` or at `price`, open or pending
+        pool = self._pool
+        self._cancel_pending(lambda slot, limit: limit is None
+                             or (side is not None and pool.side[slot] == side)
+                             or (price is not None and limit == price))
+        self._book.cancel_market()
+        if side is not None:
+            self._book.cancel_side(side)
+        if price is not None:
+            self._book.cancel_level(Side.BUY, price)
+            self._book.cancel_level(Side.SELL, price)
 
     def remove_orders(self, side=None, price=None) -> None:
-        orders_left = [order for order in self._orders if ((order.side != side) and (
-            order.price != price) and not isinstance(order, MarketOrder))]
-        self._orders = orders_left
+        """cancels market orders, and limit orders on `side` or at `price`, whether open
+        or still pending when the cancel takes effect
+        """
+        side = None if side is None else Side.of(side)
+        self._schedule(self.cancel_latency,
+                       lambda: self._cancel(lambda: self._remove_orders(side, price), side, price))
@@ -0,0 +1 @@
+from . exposure_track import ExposureTrack
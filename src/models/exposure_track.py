@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+
+from src.base import BaseAgent, BaseTimer
+from src.exceptions import SimFinished
+
+COLUMNS = ("value", "iv", "delta", "vega", "theta", "gamma")
+
+
+class ExposureTrack:
+    """Model exposures of one contract for every cycle of a timer schedule, computed once
+    so agents replaying the contract (e.g. every point of a parameter grid) read them
+    instead of calling the model each cycle.
+
+    Exposures only depend on the data, model, volatility source and schedule, never on an
+    agent's hyperparameters. The model is evaluated in one vectorized `batch` call over all
+    cycles. value, iv & delta match the per cycle model calls exactly, other greeks to
+    within rounding.
+
+    Attributes:
+        time (np.ndarray): timer time of each cycle
+        columns (Dict[str, np.ndarray]): exposure name -> value per cycle
+    """
+
+    def __init__(self, time: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.time = np.asarray(time, dtype=float)
+        self.columns = {name: np.asarray(columns[name], dtype=float) for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @classmethod
+    def build(cls, agent: BaseAgent, timer: BaseTimer) -> "ExposureTrack":
+        """Replays `agent`'s feeders on `timer` until they finish, recording the model inputs
+        the agent would use each cycle, then evaluates its model over all of them. The agent
+        only reads data, it does not trade, but its feeders are used up
+
+        Args:
+            agent (BaseAgent): a `HedgingAgent` on fresh, started feeders
+            timer (BaseTimer): timer linking the agent's feeders
+        """
+        times, inputs = [], []
+        while True:
+            timer.cycle()
+            try:
+                deriv_data = agent.deriv_feeder.get()
+                under_data = agent.under_feeder.get()
+            except SimFinished:
+                break
+
+            times.append(timer.time())
+            inputs.append(agent.model_inputs(deriv_data, under_data))
+
+        d_prices, u_prices, sigmas, _, ttes, _ = zip(*inputs) if inputs else [()] * 6
+        columns = agent.model.batch(
+            np.array(d_prices, dtype=float),
+            np.array(u_prices, dtype=float),
+            np.array(sigmas, dtype=float),
+            0,
+            np.array(ttes, dtype=float),
+            agent.strike)
+
+        return cls(np.array(times, dtype=float), columns)
+
+    def exposures(self, i: int, time: float) -> Dict[str, float]:
+        """exposures of cycle `i`, in the form returned by the model
+
+        Raises:
+            ValueError: `time` is not the time of cycle `i`, the track was built on
+                another schedule
+        """
+        if i >= len(self.time) or self.time[i] != time:
+            raise ValueError(f"exposure track does not match the timer schedule at cycle {i}")
+        return {name: column[i] for name, column in self.columns.items()}
+
+    def save(self, path: Union[str, Path]) -> None:
+        """writes the track as .npz, atomically replacing any existing file"""
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, time=self.time, **self.columns)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ExposureTrack":
+        with np.load(path) as data:
+            return cls(data["time"], {name: data[name] for name in COLUMNS})
@@ -143,3 +143,35 @@ def gamma(u_price: float, strike: int, sigma: float, mu: float, tte: float) -> f
     formula_lhs = np.exp(-(np.log(strike) - np.log(u_price) -
                          (tte*mu))**2 / (2 * tte * (sigma**2)))
     return formula_lhs * ((np.log(strike) - np.log(u_price) - (tte*(sigma**2 + mu))) / (tte * (sigma**3) * (u_price**2) * np.sqrt(2 * tte * np.pi)))
+
+
+def value_array(u_price: np.ndarray, strike: int, sigma: np.ndarray, mu: float, tte: np.ndarray) -> np.ndarray:
+    """`value` over arrays of inputs, expired points take their expiration value"""
+    u_price, sigma, tte = np.broadcast_arrays(
+        np.asarray(u_price, dtype=float), np.asarray(sigma, dtype=float), np.asarray(tte, dtype=float))
+
+    with np.errstate(all="ignore"):
+        deviations_to_strike = (
+            np.log(strike) - np.log(u_price) - (tte*mu)) / (np.sqrt(2*tte) * sigma)
+        deriv_price = .5 * (1 - erf(deviations_to_strike))
+
+    return np.where(tte <= 0, (u_price >= strike).astype(float), deriv_price)
+
+
+def iv_array(price: np.ndarray, u_price: np.ndarray, strike: int, mu: float, tte: np.ndarray) -> np.ndarray:
+    """`iv` over arrays of inputs, nan wherever `iv` would return nan
+
+    Raises:
+        ValueError: any tte is less than 0
+    """
+    price, u_price, tte = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(u_price, dtype=float), np.asarray(tte, dtype=float))
+    if np.any(tte <= 0):
+        raise ValueError("Time to expiration must be strictly positive")
+
+    with np.errstate(all="ignore"):
+        numerator = np.log(strike) - np.log(u_price) - (tte*mu)
+        denominator = np.sqrt(2*tte) * erfinv(1 - (2*price))
+        implied_vol = numerator/denominator
+
+    return np.where((implied_vol >= 0) & (price != .5), implied_vol, np.nan)
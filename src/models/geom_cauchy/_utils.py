@@ -172,3 +172,35 @@ def gamma(u_price: float, strike: int, scale: float, loc: float, tte: float) ->
     numerator = (1 + z**2) - 2 * z / (tte * scale)
     denominator = A * u_price**2 * (1 + z**2)**2
     return -numerator / denominator
+
+
+def value_array(u_price: np.ndarray, strike: int, scale: np.ndarray, loc: float, tte: np.ndarray) -> np.ndarray:
+    """`value` over arrays of inputs, expired points take their expiration value"""
+    u_price, scale, tte = np.broadcast_arrays(
+        np.asarray(u_price, dtype=float), np.asarray(scale, dtype=float), np.asarray(tte, dtype=float))
+
+    with np.errstate(all="ignore"):
+        z = (np.log(strike) - np.log(u_price) - tte * loc) / (tte * scale)
+        deriv_price = 0.5 - (1 / np.pi) * np.arctan(z)
+
+    return np.where(tte <= 0, (u_price >= strike).astype(float), deriv_price)
+
+
+def iv_array(price: np.ndarray, u_price: np.ndarray, strike: int, loc: float, tte: np.ndarray) -> np.ndarray:
+    """`iv` over arrays of inputs, nan wherever `iv` would return nan
+
+    Raises:
+        ValueError: any tte is less than 0
+    """
+    price, u_price, tte = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(u_price, dtype=float), np.asarray(tte, dtype=float))
+    if np.any(tte <= 0):
+        raise ValueError("Time to expiration must be strictly positive")
+
+    with np.errstate(all="ignore"):
+        tan_val = np.tan(np.pi * (0.5 - price))
+        numerator = np.log(strike) - np.log(u_price) - tte * loc
+        implied_scale = numerator / (tte * tan_val)
+
+    defined = (price != 0.5) & (tan_val != 0)
+    return np.where((implied_scale >= 0) & defined, implied_scale, np.nan)
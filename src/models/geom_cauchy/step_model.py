@@ -1,3 +1,7 @@
+from typing import Dict
+
+import numpy as np
+
 from src.base import BaseModel
 from src.models.geom_cauchy import _utils
 
@@ -55,3 +59,34 @@ class CauchyStepModel(BaseModel):
             "theta": theta,
             "gamma": gamma
         }
+
+    @classmethod
+    def batch(
+        cls,
+        price: np.ndarray,
+        u_price: np.ndarray,
+        estimated_scale: np.ndarray,
+        estimated_loc: float,
+        tte: np.ndarray,
+        strike: float
+    ) -> Dict[str, np.ndarray]:
+        """`__call__` over arrays of inputs, one element per point"""
+        u_price = np.asarray(u_price, dtype=float)
+        tte = np.asarray(tte, dtype=float)
+
+        iv = _utils.iv_array(price, u_price, strike, estimated_loc, tte)
+        value = _utils.value_array(u_price, strike, estimated_scale, estimated_loc, tte)
+        with np.errstate(all="ignore"):
+            delta = cls._delta(u_price, strike, iv, estimated_loc, tte)
+            vega = cls._vega(u_price, strike, iv, estimated_loc, tte)
+            theta = cls._theta(u_price, strike, iv, estimated_loc, tte)
+            gamma = cls._gamma(u_price, strike, iv, estimated_loc, tte)
+
+        return {
+            "value": value,
+            "iv": iv,
+            "delta": delta,
+            "vega": vega,
+            "theta": theta,
+            "gamma": gamma
+        }
@@ -1,2 +1,3 @@
 from . limit_order import LimitOrder
 from . market_order import MarketOrder
+from src.base.base_order import Side
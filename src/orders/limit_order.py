@@ -5,6 +5,6 @@ from src.base import BaseOrder
 # TODO: does this make sense to have as an object or does it need to see market to be valid
 
 
-@dataclass
+@dataclass(slots=True)
 class LimitOrder(BaseOrder):
     pass
@@ -1,14 +1,17 @@
-from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Union
+from numbers import Number
 
-from src.base import BaseOrder
+from src.base import BaseOrder, Side
 
 
 class MarketOrder(BaseOrder):
-    def __init__(self, count: int, side: Literal["buy", "sell"]):
-        if not (side in ["buy", "sell"]):
-            raise ValueError("sdie must be one of 'buy', 'sell'")
+    """order without a limit, filled at whatever the quote is"""
+    __slots__ = ()
 
+    def __init__(self, count: int, side: Union[Side, Literal["buy", "sell"]]):
         self.count = count
-        self.side = side
-        self.price = 100 if side == "buy" else 0
+        self.side = Side.of(side)
+        self.price = None
+
+    def fill_price(self, price: Number) -> Number:
+        return price
@@ -1,3 +1,4 @@
 from . accelerated_timer import AcceleratedTimer
 from .discrete_timer import DiscreteTimer
 from . delta_timer import DeltaTimer
+from . adaptive_timer import AdaptiveTimer
@@ -0,0 +1,107 @@
+from numbers import Number
+from typing import Optional
+
+import numpy as np
+
+from src.base.base_timer import BaseTimer
+from src.base.base_data_feeder import BaseDataFeeder
+from src.base.base_estimator import BaseEstimator
+from src.estimators import EWMAEstimator
+from src.exceptions import SimFinished
+
+
+class AdaptiveTimer(BaseTimer):
+    """
+    Timer whose step size adapts to how sensitive a step contract currently is. Steps
+    are coarse far from expiration or deep in/out of the money and fine near expiration
+    at the money, where greeks change fastest.
+
+    Each cycle the next step is the larger of
+        - `tte_fraction` of the time left to expiration
+        - the time for a one standard deviation move of the underlying to cover
+          `move_fraction` of the log distance to the strike
+    clipped to [`min_delta`, `max_delta`]. Volatility comes from an online estimator fed
+    at every cycle, so a large recent move shrinks the step.
+
+    Until `bind` is called, or while the volatility estimate warms up, steps are `min_delta`.
+    """
+
+    def __init__(self,
+                 min_delta: Number = 5,
+                 max_delta: Number = 300,
+                 tte_fraction: float = .01,
+                 move_fraction: float = .25,
+                 estimator: Optional[BaseEstimator] = None):
+        if not isinstance(min_delta, Number) or not isinstance(max_delta, Number):
+            raise TypeError("`min_delta` and `max_delta` must be Numbers")
+        if not (0 < min_delta <= max_delta):
+            raise ValueError("must have 0 < `min_delta` <= `max_delta`")
+
+        self._min_delta = min_delta
+        self._max_delta = max_delta
+        self._tte_fraction = tte_fraction
+        self._move_fraction = move_fraction
+        self._estimator = EWMAEstimator(halflife=.25) if estimator is None else estimator
+
+        self._curr_time = 0
+        self._feeder: Optional[BaseDataFeeder] = None
+        self._strike = None
+        self._expiration = None
+        self._price_key = None
+
+    def bind(self, underlying_feeder: BaseDataFeeder, strike: Number, expiration: Number,
+             price_key: str = "open") -> None:
+        """Sets the contract the step size adapts to
+
+        Args:
+            underlying_feeder (BaseDataFeeder): feeder of the underlying, driven by this timer
+            strike (Number): contract strike
+            expiration (Number): unix timestamp of contract expiration, in the feeder's time
+            price_key (str, optional): key of the underlying price in the feeder's data
+        """
+        self._feeder = underlying_feeder
+        self._strike = strike
+        self._expiration = expiration
+        self._price_key = price_key
+
+    @property
+    def curr_time(self) -> Number:
+        return self._curr_time
+
+    def next_delta(self) -> Number:
+        """Step the next call to `cycle` will take
+        """
+        if self._feeder is None:
+            return self._min_delta
+
+        try:
+            data = self._feeder.get()
+        except SimFinished:
+            return self._min_delta
+        if data is None:
+            return self._min_delta
+
+        price = data[self._price_key]
+        now = self._feeder.time()
+        self._estimator.update(data.get('ts', now), price)
+
+        tte = self._expiration - now
+        if tte <= 0:
+            return self._max_delta
+
+        sigma = self._estimator.value()
+        if np.isnan(sigma) or sigma <= 0:
+            return self._min_delta
+
+        # seconds until a 1 sd move covers `move_fraction` of the distance to strike
+        distance = abs(np.log(price / self._strike))
+        move_delta = 3600 * (self._move_fraction * distance / sigma)**2
+        tte_delta = self._tte_fraction * tte
+
+        return min(max(tte_delta, move_delta, self._min_delta), self._max_delta)
+
+    def cycle(self) -> None:
+        self._curr_time += self.next_delta()
+
+    def time(self) -> Number:
+        return self.curr_time